@@ -0,0 +1,117 @@
+"""Aggregate views of the library for the Statistics page.
+
+Every query here groups one of the trigger-maintained summary tables
+(added_stats, year_stats, genre_stats, author_genre_stats) rather than
+the books themselves, so its cost depends on the number of days, years,
+genres or author/genre pairs and not on the number of books. Results go
+through the query cache like the other read functions.
+"""
+
+import sqlite3
+
+from profiling import profiled
+from query_cache import cached_query
+
+# Start date of the period each day falls in; weeks start on Monday.
+PERIODS = {
+    "day": "day",
+    "week": "date(day, 'weekday 0', '-6 days')",
+    "month": "strftime('%Y-%m-01', day)",
+}
+
+
+@profiled
+@cached_query
+def reading_progress(conn, period="month"):
+    """Books added per day, week or month, with how many of them are read.
+
+    Returns (period_start, added, read, total_added, total_read) rows,
+    oldest first; the totals run from the first period.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f'''
+        SELECT period, added, read, SUM(added) OVER running, SUM(read) OVER running
+        FROM (
+            SELECT {PERIODS[period]} AS period, SUM(book_count) AS added, SUM(read_count) AS read
+            FROM added_stats GROUP BY period
+        )
+        WINDOW running AS (ORDER BY period)
+        ORDER BY period
+        ''')
+        return cursor.fetchall()
+    except sqlite3.Error:
+        return []
+
+
+@profiled
+@cached_query
+def genre_read_ratios(conn):
+    """(genre, book_count, read_count, read_ratio) rows, highest ratio first."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+        SELECT genres.name, stats.book_count, stats.read_count,
+               CAST(stats.read_count AS REAL) / stats.book_count AS ratio
+        FROM genre_stats AS stats
+        JOIN genres ON genres.id = stats.genre_id
+        ORDER BY ratio DESC, genres.name
+        ''')
+        return cursor.fetchall()
+    except sqlite3.Error:
+        return []
+
+
+@profiled
+@cached_query
+def year_histogram(conn, bin_size=10):
+    """Books per publication year bin of ``bin_size`` years, as (bin_start, book_count, read_count).
+
+    Bins start at multiples of ``bin_size``. Empty bins between the oldest
+    and newest book are included with zero counts, so the result can be
+    charted as is.
+    """
+    if bin_size < 1:
+        raise ValueError("bin_size must be at least 1")
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+        SELECT year - ((year % :size) + :size) % :size AS bin, SUM(book_count), SUM(read_count)
+        FROM year_stats GROUP BY bin ORDER BY bin
+        ''', {"size": bin_size})
+        rows = cursor.fetchall()
+    except sqlite3.Error:
+        return []
+
+    if not rows:
+        return []
+    counts = {bin_start: (book_count, read_count) for bin_start, book_count, read_count in rows}
+    return [(bin_start, *counts.get(bin_start, (0, 0)))
+            for bin_start in range(rows[0][0], rows[-1][0] + 1, bin_size)]
+
+
+@profiled
+@cached_query
+def author_genre_crosstab(conn, authors=10):
+    """Books per genre of the ``authors`` authors with the most books.
+
+    Returns (author, genre, book_count, read_count) rows for the pairs that
+    have books, ordered by the author's total and then by genre.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+        SELECT authors.name, genres.name, pairs.book_count, pairs.read_count
+        FROM (
+            SELECT author_id, book_count FROM author_stats ORDER BY book_count DESC, author_id LIMIT ?
+        ) AS top
+        JOIN author_genre_stats AS pairs ON pairs.author_id = top.author_id
+        JOIN authors ON authors.id = top.author_id
+        JOIN genres ON genres.id = pairs.genre_id
+        ORDER BY top.book_count DESC, top.author_id, genres.name
+        ''', (authors,))
+        return cursor.fetchall()
+    except sqlite3.Error:
+        return []
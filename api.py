@@ -0,0 +1,361 @@
+"""JSON over HTTP access to the library, without the Streamlit UI.
+
+An ASGI app built on Starlette and served by uvicorn. Reads run on the
+read-only connections of a LibraryRouter in a worker thread pool and go
+through the query cache; writes are submitted to the library's write
+queue and awaited without blocking the event loop. Each request leases
+its library, so the router only closes libraries no request is using. Every endpoint takes
+an optional ``library`` query parameter; without it the default library
+file is used. Only writes create a library; reading one that does not
+exist answers 404.
+
+GET responses carry an ETag computed from the response body and answer
+``If-None-Match`` with 304 Not Modified.
+
+    GET    /books?sort=title&genre=Fantasy&limit=50&after=<cursor>   one page; "next" is the cursor of the page after
+    GET    /books?ids=3,5,8                                          several books by id
+    GET    /books/{id}
+    POST   /books                  one book object or a list of them; ?duplicates=allow adds books already stored
+    PATCH  /books                  {"ids": [...], "read_status": true} and/or {"genre": "..."}
+    DELETE /books                  {"ids": [...]}
+    GET    /search?q=tolkien&by=author&fuzzy=1&limit=20
+    GET    /statistics
+    GET    /changes?since=1200&limit=500   changes after a sequence number; 410 Gone once they are compacted
+
+    python api.py --port 8000
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import sys
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.responses import Response
+from starlette.routing import Route
+
+from bulk_import import clean_record
+from change_log import CHANGES_PAGE_SIZE, changes_since
+from library_db import (
+    BOOK_COLUMNS,
+    DB_PATH,
+    PAGE_SIZE,
+    SEARCH_COLUMNS,
+    SORT_COLUMNS,
+    DuplicateBookError,
+    get_books_by_id,
+    get_books_page,
+    get_decade_counts,
+    get_genre_counts,
+    get_statistics,
+    get_top_authors,
+    search_books,
+)
+from library_router import DEFAULT_ROOT, LibraryNotFoundError, LibraryRouter
+
+MAX_PAGE_SIZE = 500
+MAX_BATCH_SIZE = 1000
+WRITE_TIMEOUT = 30
+
+
+def book_json(row):
+    book = dict(zip(BOOK_COLUMNS, row))
+    book["read_status"] = bool(book["read_status"])
+    return book
+
+
+def encode_cursor(row, sort_by):
+    key = [row[BOOK_COLUMNS.index(sort_by)], row[0]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        value, book_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor.")
+    return value, book_id
+
+
+def int_param(request, name, default, maximum):
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise HTTPException(400, f"{name} must be an integer.")
+    if not 1 <= value <= maximum:
+        raise HTTPException(400, f"{name} must be between 1 and {maximum}.")
+    return value
+
+
+def json_response(request, payload, status_code=200):
+    body = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    if request.method != "GET":
+        return Response(body, status_code, media_type="application/json")
+
+    etag = '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))):
+        return Response(status_code=304, headers=headers)
+    return Response(body, status_code, media_type="application/json", headers=headers)
+
+
+async def read(request, func, *args, **kwargs):
+    """Run ``func(conn, ...)`` in the thread pool on a read-only connection to the requested library.
+
+    The connection is leased from the library's pool for this call only; the
+    pool's threads live for the whole process and must not keep one each.
+    """
+    router = request.app.state.router
+    library_id = request.query_params.get("library")
+
+    def run():
+        with router.lease(library_id, create=False), router.reader(library_id).lease() as conn:
+            return func(conn, *args, **kwargs)
+
+    try:
+        return await run_in_threadpool(run)
+    except LibraryNotFoundError:
+        raise HTTPException(404, "No such library.")
+    except ValueError as error:
+        raise HTTPException(400, str(error))
+
+
+@asynccontextmanager
+async def writer_for(request):
+    """The write queue of the requested library, which stays open until the block ends."""
+    router = request.app.state.router
+    library_id = request.query_params.get("library")
+
+    def open_writer():
+        router.acquire(library_id)
+        try:
+            return router.writer(library_id)
+        except BaseException:
+            router.release(library_id)
+            raise
+
+    try:
+        writer = await run_in_threadpool(open_writer)
+    except ValueError as error:
+        raise HTTPException(400, str(error))
+    try:
+        yield writer
+    finally:
+        router.release(library_id)
+
+
+async def committed(future):
+    """Wait for a queued write's group commit without blocking the event loop."""
+    return await asyncio.wait_for(asyncio.wrap_future(future), WRITE_TIMEOUT)
+
+
+async def json_body(request):
+    try:
+        return await request.json()
+    except ValueError:
+        raise HTTPException(400, "Request body must be JSON.")
+
+
+def book_ids_from(body):
+    ids = body.get("ids") if isinstance(body, dict) else None
+    if not isinstance(ids, list) or not ids or not all(isinstance(book_id, int) for book_id in ids):
+        raise HTTPException(400, 'Expected {"ids": [<book id>, ...]}.')
+    if len(ids) > MAX_BATCH_SIZE:
+        raise HTTPException(400, f"At most {MAX_BATCH_SIZE} ids per request.")
+    return ids
+
+
+async def list_books(request):
+    ids = request.query_params.get("ids")
+    if ids is not None:
+        try:
+            book_ids = [int(book_id) for book_id in ids.split(",") if book_id]
+        except ValueError:
+            raise HTTPException(400, "ids must be a comma separated list of integers.")
+        if len(book_ids) > MAX_BATCH_SIZE:
+            raise HTTPException(400, f"At most {MAX_BATCH_SIZE} ids per request.")
+        rows = await read(request, get_books_by_id, tuple(book_ids))
+        return json_response(request, {"books": [book_json(row) for row in rows]})
+
+    sort_by = request.query_params.get("sort", "title")
+    if sort_by not in SORT_COLUMNS:
+        raise HTTPException(400, f"sort must be one of {', '.join(SORT_COLUMNS)}.")
+    genres = tuple(request.query_params.getlist("genre")) or None
+    limit = int_param(request, "limit", PAGE_SIZE, MAX_PAGE_SIZE)
+    cursor = request.query_params.get("after")
+    after = decode_cursor(cursor) if cursor else None
+
+    rows = await read(request, get_books_page, sort_by, genres, after, limit)
+    next_cursor = encode_cursor(rows[-1], sort_by) if len(rows) == limit else None
+    return json_response(request, {"books": [book_json(row) for row in rows], "next": next_cursor})
+
+
+async def get_book(request):
+    rows = await read(request, get_books_by_id, (request.path_params["book_id"],))
+    if not rows:
+        raise HTTPException(404, "No such book.")
+    return json_response(request, book_json(rows[0]))
+
+
+async def add_books(request):
+    body = await json_body(request)
+    records = body if isinstance(body, list) else [body]
+    if not records or len(records) > MAX_BATCH_SIZE:
+        raise HTTPException(400, f"Send between 1 and {MAX_BATCH_SIZE} books.")
+
+    allow_duplicates = request.query_params.get("duplicates") == "allow"
+
+    # Queue every valid book before waiting, so the whole request shares as few commits as possible.
+    results = [None] * len(records)
+    pending = []
+    async with writer_for(request) as writer:
+        for position, record in enumerate(records):
+            book, error = clean_record(record) if isinstance(record, dict) else (None, "Expected a JSON object.")
+            if error:
+                results[position] = {"error": error}
+            else:
+                pending.append((position, committed(writer.add_book(*book, allow_duplicates))))
+        outcomes = await asyncio.gather(*(waiting for _, waiting in pending), return_exceptions=True)
+    for (position, _), outcome in zip(pending, outcomes):
+        if isinstance(outcome, DuplicateBookError):
+            results[position] = {"error": "Already in the library.", "duplicate_of": outcome.book_id}
+        elif isinstance(outcome, BaseException):
+            results[position] = {"error": "Failed to add book."}
+        else:
+            results[position] = {"id": outcome}
+
+    added = sum("id" in result for result in results)
+    status_code = 201 if added == len(results) else 200 if added else 400
+    if isinstance(body, list):
+        return json_response(request, {"results": results}, status_code)
+    return json_response(request, results[0], status_code)
+
+
+async def update_books(request):
+    body = await json_body(request)
+    book_ids = book_ids_from(body)
+    if "read_status" not in body and "genre" not in body:
+        raise HTTPException(400, 'Expected "read_status" and/or "genre".')
+    genre = body.get("genre")
+    if "genre" in body and not (isinstance(genre, str) and genre.strip()):
+        raise HTTPException(400, "genre must be a non-empty string.")
+
+    updated = {}
+    async with writer_for(request) as writer:
+        try:
+            if "read_status" in body:
+                updated["read_status"] = await committed(writer.set_read_status(book_ids, bool(body["read_status"])))
+            if "genre" in body:
+                updated["genre"] = await committed(writer.set_genre(book_ids, genre.strip()))
+        except Exception:
+            raise HTTPException(500, "Failed to update the books.")
+    return json_response(request, {"updated": updated})
+
+
+async def delete_books(request):
+    book_ids = book_ids_from(await json_body(request))
+    async with writer_for(request) as writer:
+        try:
+            removed = await committed(writer.remove_books(book_ids))
+        except Exception:
+            raise HTTPException(500, "Failed to remove the books.")
+    return json_response(request, {"removed": removed})
+
+
+async def search(request):
+    term = request.query_params.get("q", "").strip()
+    search_by = request.query_params.get("by", "title")
+    if not term:
+        raise HTTPException(400, "q is required.")
+    if search_by.lower() not in SEARCH_COLUMNS:
+        raise HTTPException(400, f"by must be one of {', '.join(SEARCH_COLUMNS)}.")
+    limit = int_param(request, "limit", PAGE_SIZE, MAX_PAGE_SIZE)
+    fuzzy = request.query_params.get("fuzzy", "0").lower() in ("1", "true", "yes")
+    rows = await read(request, search_books, term, search_by, limit, fuzzy)
+    return json_response(request, {"books": [book_json(row) for row in rows]})
+
+
+async def statistics(request):
+    def collect(conn):
+        total_books, read_books, percentage_read = get_statistics(conn)
+        return {
+            "total_books": total_books,
+            "read_books": read_books,
+            "percentage_read": percentage_read,
+            "genres": dict(get_genre_counts(conn)),
+            "decades": dict(get_decade_counts(conn)),
+            "top_authors": dict(get_top_authors(conn, 5)),
+        }
+
+    return json_response(request, await read(request, collect))
+
+
+async def changes(request):
+    try:
+        since = int(request.query_params.get("since", "0"))
+    except ValueError:
+        raise HTTPException(400, "since must be an integer.")
+    if since < 0:
+        raise HTTPException(400, "since must not be negative.")
+    limit = int_param(request, "limit", CHANGES_PAGE_SIZE, CHANGES_PAGE_SIZE)
+    batch = await read(request, changes_since, since, limit)
+    if batch.resync:
+        return json_response(request, {"error": "These changes were compacted. Read all books again, then continue "
+                                                "from latest.", "latest": batch.next_seq}, 410)
+    return json_response(request, {
+        "changes": [{"seq": seq, "operation": operation, "book_id": book_id, "changed_at": changed_at,
+                     "book": book_json(book) if book else None}
+                    for seq, book_id, operation, changed_at, book in batch.changes],
+        "next": batch.next_seq,
+        "more": batch.more,
+    })
+
+
+async def http_error(request, error):
+    return Response(json.dumps({"error": error.detail}), error.status_code, media_type="application/json")
+
+
+def create_app(router=None):
+    """The ASGI app; pass a LibraryRouter to choose where libraries live."""
+    app = Starlette(
+        routes=[
+            Route("/books", list_books, methods=["GET"]),
+            Route("/books", add_books, methods=["POST"]),
+            Route("/books", update_books, methods=["PATCH"]),
+            Route("/books", delete_books, methods=["DELETE"]),
+            Route("/books/{book_id:int}", get_book, methods=["GET"]),
+            Route("/search", search, methods=["GET"]),
+            Route("/statistics", statistics, methods=["GET"]),
+            Route("/changes", changes, methods=["GET"]),
+        ],
+        exception_handlers={HTTPException: http_error},
+    )
+    app.state.router = router or LibraryRouter()
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the library as a JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--db", default=DB_PATH, help="default library database (default: %(default)s)")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="directory of per-library databases (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    uvicorn.run(create_app(LibraryRouter(args.root, args.db)), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
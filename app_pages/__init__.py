@@ -0,0 +1,68 @@
+"""The pages of the Streamlit app, one module each.
+
+app.py imports a page's module the first time the page is shown, so what
+only some pages need is never imported by sessions that do not open them;
+pandas, for one, is only loaded by Statistics and the table view of View
+All Books. Every module has a ``render(library)`` function that draws the
+page for the session's ``Library``.
+"""
+
+import importlib
+import os
+
+import streamlit as st
+
+from profiling import PROFILER
+
+# Sidebar label: (icon, module).
+PAGES = {
+    "Home": ("🏠", "home"),
+    "Add Book": ("➕", "add_book"),
+    "Remove Book": ("🗑️", "remove_book"),
+    "Search Books": ("🔍", "search"),
+    "View All Books": ("📋", "view_all"),
+    "Duplicates": ("🧩", "duplicates"),
+    "Statistics": ("📊", "statistics"),
+}
+WRITE_TIMEOUT = 30
+STYLESHEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "style.css")
+
+
+class Library:
+    """The session's library as the pages use it."""
+
+    def __init__(self, manager, reader, writer, card_renderer):
+        self.manager = manager
+        self.reader = reader
+        self.writer = writer
+        self.card_renderer = card_renderer
+        # Pages read through read-only connections, so long reads never hold up writes.
+        self.conn = reader.connection()
+        self.column_names = reader.column_names
+
+    def release(self):
+        """Give back the connections this script run took; call once the page is drawn."""
+        self.manager.release()
+        self.reader.release()
+    
+    def wait_for_write(self, future):
+        """The result of a queued write, or None if it failed or did not finish in time."""
+        try:
+            return future.result(timeout=WRITE_TIMEOUT)
+        except Exception:
+            return None
+
+    def display_book_grid(self, books):
+        with PROFILER.span("render:book_grid"):
+            st.markdown(self.card_renderer.grid(books), unsafe_allow_html=True)
+
+
+def load_page(label):
+    """The module of the page called ``label``, imported the first time it is asked for."""
+    return importlib.import_module(f"{__name__}.{PAGES[label][1]}")
+
+
+@st.cache_resource
+def stylesheet():
+    with open(STYLESHEET_PATH, encoding="utf-8") as css:
+        return css.read()
@@ -0,0 +1,89 @@
+"""Add one book with a form, or many from an uploaded file."""
+
+from datetime import datetime
+
+import streamlit as st
+
+from app_pages import WRITE_TIMEOUT
+from bulk_import import BOOK_FIELDS, checkpoint_key, detect_format, import_books
+from library_db import MIN_PUBLICATION_YEAR, DuplicateBookError, validate_book
+
+
+def render(library):
+    st.title("Add a New Book")
+    
+    st.markdown("""
+    <div class="simple-card">
+        <p>Add books to your personal collection by filling out the form below.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    with st.form("add_book_form"):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            title = st.text_input("Book Title")
+            author = st.text_input("Author")
+            genre = st.text_input("Genre")
+            publication_year = st.number_input("Publication Year", min_value=MIN_PUBLICATION_YEAR, max_value=datetime.now().year, value=2023)
+            read_status = st.checkbox("Have you read this book?")
+            allow_duplicate = st.checkbox("Add it even if it is already in the collection")
+        
+        submitted = st.form_submit_button("Add Book")
+        
+        if submitted:
+            validation_error = validate_book(title, author, publication_year, genre)
+            if validation_error is None:
+                future = library.writer.add_book(title, author, publication_year, genre, read_status, allow_duplicate)
+                try:
+                    future.result(timeout=WRITE_TIMEOUT)
+                except DuplicateBookError as error:
+                    st.warning(f"{error} Tick the last box to add another copy.")
+                except Exception:
+                    st.error("Failed to add book. Please try again.")
+                else:
+                    st.success("Book added successfully to your collection.")
+            else:
+                st.warning(validation_error)
+    
+    st.subheader("Bulk Import")
+    
+    st.markdown("""
+    <div class="simple-card">
+        <p>Import many books at once from a CSV, JSON Lines or Parquet file with the columns title, author, publication_year, genre and read_status. Books already in your collection are skipped. An interrupted import continues where it stopped when the same file is imported again.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    uploaded_file = st.file_uploader("Choose a file", type=["csv", "json", "jsonl", "ndjson", "parquet"])
+    
+    if uploaded_file is not None and st.button("Import Books"):
+        progress = st.empty()
+        rejected_rows = []
+        
+        def show_batch(batch):
+            progress.info(f"Batch {batch.number}: {batch.imported} imported, {batch.rejected} rejected ({batch.rows_per_second:,.0f} rows/s)")
+        
+        def keep_rejected_row(record_number, record, reason):
+            if len(rejected_rows) < 100:
+                rejected_row = {"record": record_number}
+                rejected_row.update({name: record.get(name) for name in BOOK_FIELDS})
+                rejected_row["reason"] = reason
+                rejected_rows.append(rejected_row)
+        
+        try:
+            report = import_books(
+                library.manager.connection(),
+                uploaded_file,
+                detect_format(uploaded_file.name),
+                checkpoint_key(uploaded_file.name, uploaded_file.size),
+                on_batch=show_batch,
+                on_reject=keep_rejected_row,
+            )
+        except (ValueError, RuntimeError) as error:
+            st.error(f"Import failed: {error}")
+        else:
+            resumed = f" (resumed after record {report.skipped})" if report.skipped else ""
+            st.success(f"Imported {report.imported} books in {report.seconds:.1f}s ({report.rows_per_second:,.0f} rows/s){resumed}.")
+            if report.rejected:
+                st.warning(f"{report.rejected} rows were rejected. The first {len(rejected_rows)} are shown below.")
+                st.dataframe(rejected_rows)
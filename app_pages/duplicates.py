@@ -0,0 +1,95 @@
+"""Scan for books entered more than once and merge or dismiss each group found."""
+
+import streamlit as st
+
+from dedup import (
+    DEFAULT_THRESHOLD,
+    count_duplicate_groups,
+    dismiss_group,
+    find_near_duplicates,
+    get_duplicate_groups,
+    save_duplicate_groups,
+)
+from library_db import BOOK_COLUMNS
+
+GROUPS_PER_PAGE = 10
+
+
+def render(library):
+    st.title("Find Duplicate Books")
+    
+    st.markdown("""
+    <div class="simple-card">
+        <p>Find books that were entered more than once, even with a typo or the author written differently, then merge each group into one book.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    if "duplicates_message" in st.session_state:
+        message_type, message = st.session_state.pop("duplicates_message")
+        getattr(st, message_type)(message)
+    
+    group_count, book_count = count_duplicate_groups(library.conn)
+    
+    with st.expander("Scan the library", expanded=group_count == 0):
+        threshold = st.slider("Title similarity", min_value=0.5, max_value=1.0, value=DEFAULT_THRESHOLD, step=0.05,
+                              help="How alike two titles must be to count as the same book.")
+        st.caption("Large libraries take about a minute per million books. "
+                   "You can also run `python dedup.py` from the command line.")
+        if st.button("Scan for Duplicates"):
+            with st.spinner("Comparing books..."):
+                report = find_near_duplicates(library.reader.connection(), threshold)
+                saved = library.wait_for_write(library.writer.submit(save_duplicate_groups, report.groups))
+            if saved is None:
+                st.session_state.duplicates_message = ("error", "Failed to save the scan. Please try again.")
+            else:
+                st.session_state.duplicates_message = (
+                    "success", f"Compared {report.books} books in {report.seconds:.1f}s and found {len(report.groups)} groups of duplicates.")
+            st.session_state.duplicates_offset = 0
+            st.rerun()
+    
+    if group_count == 0:
+        st.info("No duplicates to review. Scan the library to look for some.")
+        return
+    
+    offset = min(st.session_state.get("duplicates_offset", 0), (group_count - 1) // GROUPS_PER_PAGE * GROUPS_PER_PAGE)
+    st.success(f"{group_count} groups hold {book_count} books (showing {offset + 1} to {min(offset + GROUPS_PER_PAGE, group_count)})")
+    
+    def merge_group(group_id, book_ids):
+        keep_id = st.session_state[f"keep_{group_id}"]
+        merged = library.wait_for_write(library.writer.merge_books(keep_id, [book_id for book_id in book_ids if book_id != keep_id]))
+        if merged is None:
+            st.session_state.duplicates_message = ("error", "Failed to merge the books. Please try again.")
+        else:
+            library.card_renderer.invalidate(book_ids)
+            st.session_state.duplicates_message = ("success", f"Merged {merged} duplicates into book #{keep_id}.")
+    
+    def dismiss(book_ids):
+        if library.wait_for_write(library.writer.submit(dismiss_group, book_ids)) is None:
+            st.session_state.duplicates_message = ("error", "Failed to update the group. Please try again.")
+    
+    def describe(book):
+        status = "read" if book["read_status"] == 1 else "unread"
+        return (f"#{book['id']} {book['title']} by {book['author']} ({book['publication_year']}) · "
+                f"{book['genre'] or 'no genre'} · {status} · added {str(book['date_added'])[:10]}")
+    
+    for group_id, similarity, rows in get_duplicate_groups(library.conn, GROUPS_PER_PAGE, offset):
+        labels = {row[0]: describe(dict(zip(BOOK_COLUMNS, row))) for row in rows}
+        book_ids = list(labels)
+        with st.container(border=True):
+            st.markdown(f"**{len(book_ids)} copies** · titles at least {similarity:.0%} alike")
+            st.radio("Keep", book_ids, format_func=labels.get, key=f"keep_{group_id}")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.button("Merge into the kept book", key=f"merge_{group_id}", on_click=merge_group, args=(group_id, book_ids))
+            with col2:
+                st.button("Not duplicates", key=f"dismiss_{group_id}", on_click=dismiss, args=(book_ids,))
+    
+    def show_page(new_offset):
+        st.session_state.duplicates_offset = new_offset
+    
+    col1, col2, col3 = st.columns([1, 1, 1])
+    with col1:
+        st.button("Previous Page", on_click=show_page, args=(max(0, offset - GROUPS_PER_PAGE),), disabled=offset == 0)
+    with col3:
+        st.button("Next Page", on_click=show_page, args=(offset + GROUPS_PER_PAGE,),
+                  disabled=offset + GROUPS_PER_PAGE >= group_count)
@@ -0,0 +1,81 @@
+"""The landing page: totals, a short feature list and the newest books."""
+
+import streamlit as st
+
+from library_db import get_home_snapshot
+
+
+def render(library):
+    st.title("📚 Personal Library Manager")
+    
+    st.markdown("""
+    <div class="simple-card">
+        <h2>Welcome to your Personal Library Manager!</h2>
+        <p>Track, organize, and discover your collection.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    total_books, read_books, percentage_read, recent_books = get_home_snapshot(library.conn, 3)
+    
+    st.subheader("Quick Overview")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.markdown("""
+        <div class="metric-card">
+            <h3>Total Books</h3>
+            <p>{}</p>
+        </div>
+        """.format(total_books), unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown("""
+        <div class="metric-card">
+            <h3>Books Read</h3>
+            <p>{}</p>
+        </div>
+        """.format(read_books), unsafe_allow_html=True)
+        
+    with col3:
+        st.markdown("""
+        <div class="metric-card">
+            <h3>Progress</h3>
+            <p>{:.1f}%</p>
+        </div>
+        """.format(percentage_read), unsafe_allow_html=True)
+    
+    st.subheader("Features")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("""
+        <div class="simple-card">
+            <h3>Manage Your Collection</h3>
+            <ul>
+                <li>Add new books to your library</li>
+                <li>Remove books you no longer own</li>
+                <li>Keep track of reading status</li>
+                <li>Organize by genre and author</li>
+            </ul>
+       </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown("""
+        <div class="simple-card">
+            <h3>Discover Insights</h3>
+            <ul>
+                <li>Track reading progress</li>
+                <li>Visualize genre distribution</li>
+                <li>Identify your favorite authors</li>
+                <li>Analyze publication years</li>
+            </ul>
+        </div>
+        """, unsafe_allow_html=True)
+
+    if total_books > 0:
+        st.subheader("Recent Additions")
+        
+        if recent_books:
+            library.display_book_grid([dict(zip(library.column_names, book)) for book in recent_books])
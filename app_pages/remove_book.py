@@ -0,0 +1,71 @@
+"""Pick books by title and remove them or change their read status or genre together."""
+
+import streamlit as st
+
+from library_db import count_books, search_books
+
+
+def render(library):
+    st.title("Remove or Update Books")
+    
+    st.markdown("""
+    <div class="simple-card">
+        <p>Find books by title, select one or more, then remove them or update them together.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    if "manage_message" in st.session_state:
+        message_type, message = st.session_state.pop("manage_message")
+        getattr(st, message_type)(message)
+    
+    if count_books(library.conn) == 0:
+        st.info("Your library is empty. Add some books to get started!")
+    else:
+        # Labels of every book offered so far, so a selection survives changing the search term.
+        book_labels = st.session_state.setdefault("manage_labels", {})
+        
+        # live=True reruns as the user types, like the Search page, instead of waiting for Enter.
+        picker_term = st.text_input("Find books by title", placeholder="Start typing a title...", live=True)
+        match_ids = []
+        if picker_term:
+            for book in search_books(library.conn, picker_term, "Title", limit=50):
+                book = dict(zip(library.column_names, book))
+                book_labels[book["id"]] = f"{book['title']} by {book['author']} ({book['publication_year']})"
+                match_ids.append(book["id"])
+            if not match_ids:
+                st.info(f"No books match '{picker_term}'.")
+        
+        selected = [book_id for book_id in st.session_state.get("manage_selection", []) if book_id in book_labels]
+        offered_ids = match_ids + [book_id for book_id in selected if book_id not in match_ids]
+        selected_ids = st.multiselect(
+            "Selected books",
+            offered_ids,
+            format_func=lambda book_id: book_labels.get(book_id, f"Book #{book_id}"),
+            key="manage_selection",
+        )
+        
+        def run_batch_action(action, outcome, *args):
+            book_ids = list(st.session_state.manage_selection)
+            changed = library.wait_for_write(action(book_ids, *args))
+            if changed is None:
+                st.session_state.manage_message = ("error", "Failed to update the selected books. Please try again.")
+            else:
+                st.session_state.manage_message = ("success", f"{changed} {'book' if changed == 1 else 'books'} {outcome}.")
+                if action == library.writer.remove_books:
+                    st.session_state.manage_selection = []
+                    library.card_renderer.invalidate(book_ids)
+                    for book_id in book_ids:
+                        book_labels.pop(book_id, None)
+        
+        if selected_ids:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.button("Remove Selected", on_click=run_batch_action, args=(library.writer.remove_books, "removed from your collection"))
+            with col2:
+                st.button("Mark as Read", on_click=run_batch_action, args=(library.writer.set_read_status, "marked as read", True))
+            with col3:
+                st.button("Mark as Unread", on_click=run_batch_action, args=(library.writer.set_read_status, "marked as unread", False))
+            
+            new_genre = st.text_input("New genre for the selected books")
+            st.button("Set Genre", on_click=run_batch_action, args=(library.writer.set_genre, "moved to the new genre", new_genre.strip()),
+                      disabled=not new_genre.strip())
@@ -0,0 +1,62 @@
+"""Search as you type by title, author or genre."""
+
+import streamlit as st
+
+from library_db import PAGE_SIZE
+from live_search import MIN_TERM_LENGTH, LiveSearch
+
+
+def render(library):
+    st.title("Search for Books")
+    
+    st.markdown("""
+    <div class="simple-card">
+        <p>Find books in your collection by title, author, or genre.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    if "live_search" not in st.session_state:
+        st.session_state.live_search = LiveSearch()
+    
+    def reset_search_results():
+        st.session_state.search_shown = PAGE_SIZE
+    
+    def show_more_results():
+        st.session_state.search_shown += PAGE_SIZE
+    
+    # A fragment, so typing reruns only the search and not the whole page.
+    @st.fragment
+    def live_search_results():
+        col1, col2 = st.columns([1, 3])
+        
+        with col1:
+            search_by = st.radio("Search by", ["Title", "Author", "Genre"], on_change=reset_search_results)
+        
+        with col2:
+            # live=True waits 250 ms; a duration string such as "300ms" is parsed by pandas, which
+            # would otherwise be imported just to open this page.
+            search_term = st.text_input("Enter search term", placeholder="Type here to search...", type="search",
+                                        live=True, on_change=reset_search_results)
+            fuzzy = st.checkbox("Tolerate typos", on_change=reset_search_results,
+                                help="Also match words spelled differently, such as \"Tolkein\" for \"Tolkien\".")
+        
+        search_term = search_term.strip()
+        if len(search_term) < MIN_TERM_LENGTH:
+            if search_term:
+                st.caption(f"Type at least {MIN_TERM_LENGTH} characters to search.")
+            return
+        
+        shown = st.session_state.setdefault("search_shown", PAGE_SIZE)
+        results = st.session_state.live_search.search(library.reader.connection(), search_term, search_by, fuzzy, wanted=shown + 1)
+        
+        if results:
+            more = len(results) > shown
+            st.success(f"Showing the first {shown} matching books" if more else f"Found {len(results)} matching books")
+            
+            library.display_book_grid([dict(zip(library.column_names, book)) for book in results[:shown]])
+            if more:
+                st.button("Load more", on_click=show_more_results)
+        else:
+            st.info(f"No books match your search for '{search_term}' in {search_by}.")
+    
+    live_search_results()
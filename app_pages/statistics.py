@@ -0,0 +1,125 @@
+"""Totals, genre and author breakdowns, reading progress and publication years."""
+
+import pandas as pd
+import streamlit as st
+
+from analytics import author_genre_crosstab, genre_read_ratios, reading_progress, year_histogram
+from library_db import (
+    get_genre_counts,
+    get_most_read_author,
+    get_publication_extremes,
+    get_statistics,
+    get_top_authors,
+)
+
+
+def render(library):
+    st.title("Library Statistics")
+    
+    st.markdown("""
+    <div class="simple-card">
+        <p>Get insights about your book collection.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    total_books, read_books, percentage_read = get_statistics(library.conn)
+    
+    if total_books == 0:
+        st.info("Your library is empty. Add some books to see statistics!")
+    else:
+        st.subheader("Reading Progress")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.markdown("""
+            <div class="metric-card">
+                <h3>Total Books</h3>
+                <p>{}</p>
+            </div>
+            """.format(total_books), unsafe_allow_html=True)
+        
+        with col2:
+            st.markdown("""
+            <div class="metric-card">
+                <h3>Books Read</h3>
+                <p>{}</p>
+            </div>
+            """.format(read_books), unsafe_allow_html=True)
+            
+        with col3:
+            st.markdown("""
+            <div class="metric-card">
+                <h3>Progress</h3>
+                <p>{:.1f}%</p>
+            </div>
+            """.format(percentage_read), unsafe_allow_html=True)
+        
+        period = st.radio("Books added per", ["Week", "Month"], index=1, horizontal=True)
+        progress = reading_progress(library.conn, period.lower())
+        if progress:
+            progress_df = pd.DataFrame(progress, columns=["period", "added", "read", "Books added", "Books read"])
+            st.line_chart(progress_df.set_index("period")[["Books added", "Books read"]])
+        
+        genre_counts = get_genre_counts(library.conn)
+        if genre_counts:
+            st.subheader("Genre Distribution")
+            
+            st.bar_chart(pd.Series(dict(genre_counts)))
+            
+            most_common_genre, most_common_count = genre_counts[0]
+            st.markdown(f"""
+            <div class="simple-card">
+                <p>Your most common genre is <strong>{most_common_genre}</strong> with <strong>{most_common_count}</strong> books.</p>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            ratios = genre_read_ratios(library.conn)
+            st.markdown("**Share read by genre**")
+            st.bar_chart(pd.Series({genre: ratio * 100 for genre, _, _, ratio in ratios}, name="% read"))
+        
+        st.subheader("Publication Years")
+        bin_size = st.select_slider("Years per bar", options=[1, 5, 10, 25, 50, 100], value=10)
+        histogram = year_histogram(library.conn, bin_size)
+        if histogram:
+            histogram_df = pd.DataFrame(histogram, columns=["years", "Books", "Read"])
+            st.bar_chart(histogram_df.set_index("years")[["Books", "Read"]], stack=False)
+            
+            oldest_book, newest_book = get_publication_extremes(library.conn)
+            if oldest_book and newest_book:
+                st.markdown(f"""
+                <div class="simple-card">
+                    <p>Your oldest book is <strong>{oldest_book[0]}</strong> ({oldest_book[1]}) by {oldest_book[2]}.</p>
+                    <p>Your newest book is <strong>{newest_book[0]}</strong> ({newest_book[1]}) by {newest_book[2]}.</p>
+                </div>
+                """, unsafe_allow_html=True)
+        
+        top_authors = get_top_authors(library.conn, 5)
+        if top_authors:
+            st.subheader("Author Breakdown")
+            
+            st.markdown("""
+            <div class="simple-card">
+                <h3>Top Authors</h3>
+            """, unsafe_allow_html=True)
+            
+            for author, count in top_authors:
+                st.markdown(f"- <strong>{author}</strong>: {count} books", unsafe_allow_html=True)
+            
+            st.markdown("</div>", unsafe_allow_html=True)
+            
+            most_read = get_most_read_author(library.conn)
+            if most_read:
+                most_read_author, most_read_count = most_read
+                st.markdown(f"""
+                <div class="simple-card">
+                    <p>You've read the most books by <strong>{most_read_author}</strong> ({most_read_count} books).</p>
+                </div>
+                """, unsafe_allow_html=True)
+            
+            author_count = st.slider("Authors in the genre breakdown", 5, 50, 10)
+            crosstab = author_genre_crosstab(library.conn, author_count)
+            if crosstab:
+                crosstab_df = pd.DataFrame(crosstab, columns=["author", "genre", "books", "read"])
+                table = crosstab_df.pivot(index="author", columns="genre", values="books")
+                # pivot sorts authors by name; keep the most prolific first.
+                table = table.reindex(crosstab_df["author"].unique()).fillna(0).astype(int)
+                st.dataframe(table)
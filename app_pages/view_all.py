@@ -0,0 +1,91 @@
+"""Browse every book a page at a time, filtered by genre and sorted, and export the selection."""
+
+import streamlit as st
+
+from bulk_export import EXPORT_FORMATS, export_to_temporary_file
+from library_db import BOOK_COLUMNS, PAGE_SIZE, SORT_COLUMNS, count_books, get_books_page, get_genres
+from profiling import PROFILER
+
+
+def render(library):
+    st.title("All Books in Your Library")
+    
+    if count_books(library.conn) == 0:
+        st.info("Your library is empty. Start by adding some books!")
+    else:
+        st.subheader("Filter and Sort")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            all_genres = get_genres(library.conn)
+            genre_filter = st.multiselect("Filter by Genre", options=all_genres if all_genres else ["No genres available"])
+        with col2:
+            sort_labels = [col.replace('_', ' ').title() for col in SORT_COLUMNS]
+            sort_dict = dict(zip(sort_labels, SORT_COLUMNS))
+            
+            sort_by_label = st.selectbox("Sort by", sort_labels)
+            sort_by = sort_dict[sort_by_label]
+        
+        if not all_genres:
+            genre_filter = []
+        
+        # Each entry is the seek key a page starts after; reset whenever the query changes.
+        view_query = (tuple(genre_filter), sort_by)
+        if st.session_state.get("view_all_query") != view_query:
+            st.session_state.view_all_query = view_query
+            st.session_state.view_all_cursors = [None]
+        page_cursors = st.session_state.view_all_cursors
+        
+        filtered_total = count_books(library.conn, genre_filter)
+        books = get_books_page(library.conn, sort_by, genre_filter, after=page_cursors[-1])
+        page_count = max(1, (filtered_total + PAGE_SIZE - 1) // PAGE_SIZE)
+        
+        st.success(f"Showing {len(books)} of {filtered_total} books (page {len(page_cursors)} of {page_count})")
+        
+        library.display_book_grid([dict(zip(BOOK_COLUMNS, book)) for book in books])
+        
+        def show_previous_page():
+            st.session_state.view_all_cursors.pop()
+        
+        def show_next_page(last_key):
+            st.session_state.view_all_cursors.append(last_key)
+        
+        sort_index = BOOK_COLUMNS.index(sort_by)
+        col1, col2, col3 = st.columns([1, 1, 1])
+        with col1:
+            st.button("Previous Page", on_click=show_previous_page, disabled=len(page_cursors) == 1)
+        with col3:
+            has_next = len(page_cursors) < page_count and bool(books)
+            last_key = (books[-1][sort_index], books[-1][0]) if books else None
+            st.button("Next Page", on_click=show_next_page, args=(last_key,), disabled=not has_next)
+        
+        show_table = st.checkbox("Show as table instead")
+        if show_table:
+            # The only part of this page that needs pandas, so it is imported on first use.
+            from columnar import frame_from_rows, read_status_labels
+            
+            display_columns = ["title", "author", "publication_year", "genre", "read_status"]
+            with PROFILER.span("pandas:view_all_table", "pandas"):
+                df = frame_from_rows(books, BOOK_COLUMNS)
+                df["read_status"] = read_status_labels(df["read_status"])
+            st.dataframe(df[display_columns])
+        
+        st.subheader("Export")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            export_format = st.selectbox("Export format", list(EXPORT_FORMATS), format_func=str.upper)
+        with col2:
+            # Generated on click, from the same filter and sort as the page, into a temporary file.
+            # That happens after the run, on a server thread, so it leases a connection of its own.
+            def export():
+                with library.reader.lease() as conn:
+                    return export_to_temporary_file(conn, export_format, sort_by, genre_filter)
+            
+            st.download_button(
+                f"Download {filtered_total} books",
+                data=export,
+                file_name="library" + EXPORT_FORMATS[export_format]["extension"],
+                mime=EXPORT_FORMATS[export_format]["mime"],
+                on_click="ignore",
+            )
@@ -0,0 +1 @@
+"""Benchmarks for the library data layer; run the modules with ``python -m``."""
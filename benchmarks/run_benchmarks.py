@@ -0,0 +1,304 @@
+"""Time the library data layer against synthetic libraries of several sizes.
+
+For each size a synthetic library is generated once (and reused on later
+runs), then every operation is timed several times. Results are written as
+JSON and, given a baseline file from an earlier run, compared against it;
+the exit status is 1 when any operation regressed beyond the threshold.
+
+    python -m benchmarks.run_benchmarks --sizes 10000,100000 --baseline benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --sizes 10000,100000 --save-baseline benchmarks/baseline.json
+
+Reads bypass the query cache so the numbers reflect SQLite and Python work.
+"""
+
+import argparse
+import importlib.util
+import itertools
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import analytics
+import change_log
+import dedup
+import library_db
+from benchmarks.synthetic_library import create_library
+from write_queue import WriteQueue
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+SEARCH_TERMS = {
+    "Title": ["river", "the silent", '"lost kingdom"'],
+    "Author": ["smith", "murakami", "jane aus"],
+    "Genre": ["fantasy", "science fic"],
+}
+FUZZY_SEARCH_TERMS = {
+    "Title": ["silnet rivr", "hiden gardn"],
+    "Author": ["tolstoi", "murakmi"],
+}
+
+
+def time_call(func, repeat):
+    """Run ``func`` ``repeat`` times and return its timings in milliseconds."""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        durations.append((time.perf_counter() - started) * 1000)
+    stats = {
+        "runs": repeat,
+        "min_ms": min(durations),
+        "median_ms": statistics.median(durations),
+        "mean_ms": statistics.fmean(durations),
+    }
+    if isinstance(result, list):
+        stats["rows"] = len(result)
+    return stats
+
+
+def peak_memory_mb(func):
+    """Peak Python-heap allocation of one call of ``func``, in megabytes."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1_000_000
+    finally:
+        tracemalloc.stop()
+
+
+def pandas_statistics(conn):
+    """The Statistics page's original pandas aggregations over the whole table, for comparison."""
+    import pandas as pd
+
+    df = pd.DataFrame(library_db.get_all_books.uncached(conn), columns=library_db.get_column_names(conn))
+    genre_counts = df["genre"].value_counts()
+    df["decade"] = df["publication_year"].apply(lambda x: (x // 10) * 10)
+    decade_counts = df["decade"].value_counts().sort_index()
+    top_authors = df["author"].value_counts().head(5)
+    read_author_counts = df[df["read_status"] == 1]["author"].value_counts()
+    return [genre_counts, decade_counts, top_authors, read_author_counts]
+
+
+def columnar_statistics(conn):
+    """The same aggregations over a typed, column-oriented frame of only the needed columns."""
+    import columnar
+
+    return columnar.frame_statistics(columnar.books_frame(conn, columns=columnar.STATISTICS_COLUMNS))
+
+
+def aggregate_statistics(conn):
+    """What the Statistics page reads now: the trigger-maintained summary tables."""
+    return [
+        library_db.get_statistics.uncached(conn),
+        library_db.get_genre_counts.uncached(conn),
+        library_db.get_decade_counts.uncached(conn),
+        library_db.get_top_authors.uncached(conn, 5),
+        library_db.get_most_read_author.uncached(conn),
+        library_db.get_publication_extremes.uncached(conn),
+    ]
+
+
+def scan_duplicates(conn):
+    dedup.save_duplicate_groups(conn, dedup.find_near_duplicates(conn).groups)
+    conn.commit()
+
+
+def prepare_library(size, seed, regenerate=False):
+    """Return the path of a migrated copy of the synthetic library and the time init_db took to migrate it."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    source = os.path.join(DATA_DIR, f"library-{size}-seed{seed}.db")
+    if regenerate or not os.path.exists(source):
+        print(f"  generating {size:,} books...", flush=True)
+        create_library(source, size, seed)
+
+    path = os.path.join(DATA_DIR, f"bench-{size}.db")
+    for leftover in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    shutil.copyfile(source, path)
+
+    started = time.perf_counter()
+    library_db.init_db(path).close()
+    return path, (time.perf_counter() - started) * 1000
+
+
+def benchmark_size(size, seed, repeat, skip, regenerate=False):
+    results = {}
+    path, migrate_ms = prepare_library(size, seed, regenerate)
+    results["init_db (migrate legacy schema)"] = {"runs": 1, "min_ms": migrate_ms, "median_ms": migrate_ms, "mean_ms": migrate_ms}
+
+    def record(name, func, times=repeat):
+        if any(name.startswith(prefix) for prefix in skip):
+            return
+        results[name] = time_call(func, times)
+        print(f"  {name:<40} {results[name]['median_ms']:>10.2f} ms", flush=True)
+
+    record("init_db (up to date)", lambda: library_db.init_db(path).close())
+
+    conn = library_db.connect(path)
+    for search_by, terms in SEARCH_TERMS.items():
+        for term in terms:
+            record(f"search_books[{search_by}:{term}]",
+                   lambda: library_db.search_books.uncached(conn, term, search_by))
+    for search_by, terms in FUZZY_SEARCH_TERMS.items():
+        for term in terms:
+            record(f"search_books fuzzy[{search_by}:{term}]",
+                   lambda: library_db.search_books.uncached(conn, term, search_by, 10, fuzzy=True))
+    record("get_books_page", lambda: library_db.get_books_page.uncached(conn, "title"))
+    for sort_by in ["author", "genre"]:
+        record(f"get_books_page[{sort_by}]", lambda: library_db.get_books_page.uncached(conn, sort_by))
+    for genres in [("Fantasy", "Horror"), ("Poetry",)]:
+        record(f"get_books_page[genre in {', '.join(genres)}]",
+               lambda: library_db.get_books_page.uncached(conn, "author", genres))
+    record("count_books", lambda: library_db.count_books.uncached(conn))
+    record("count_books[genre in Poetry]", lambda: library_db.count_books.uncached(conn, ("Poetry",)))
+    record("get_genres", lambda: library_db.get_genres.uncached(conn))
+    record("get_statistics", lambda: library_db.get_statistics.uncached(conn))
+    record("get_home_snapshot", lambda: library_db.get_home_snapshot.uncached(conn))
+    record("statistics (summary tables)", lambda: aggregate_statistics(conn))
+    for period in ["week", "month"]:
+        record(f"reading_progress[{period}]", lambda: analytics.reading_progress.uncached(conn, period))
+    record("genre_read_ratios", lambda: analytics.genre_read_ratios.uncached(conn))
+    for bin_size in [1, 10]:
+        record(f"year_histogram[{bin_size}]", lambda: analytics.year_histogram.uncached(conn, bin_size))
+    record("author_genre_crosstab[10]", lambda: analytics.author_genre_crosstab.uncached(conn, 10))
+    record("find_near_duplicates (scan and save)", lambda: scan_duplicates(conn), times=1)
+    record("get_duplicate_groups", lambda: dedup.get_duplicate_groups.uncached(conn))
+    record("get_all_books", lambda: library_db.get_all_books.uncached(conn), times=1)
+    if importlib.util.find_spec("pandas") is None:
+        print("  pandas not installed; skipping pandas statistics")
+    else:
+        for name, func in [("statistics (pandas, legacy page)", pandas_statistics),
+                           ("statistics (pandas, columnar)", columnar_statistics)]:
+            record(name, lambda: func(conn), times=1)
+            if name in results:
+                results[name]["peak_mb"] = peak_memory_mb(lambda: func(conn))
+                print(f"  {'':<40} {results[name]['peak_mb']:>10.1f} MB peak", flush=True)
+
+    adds = max(repeat, 20)
+    if not any("add_book".startswith(prefix) for prefix in skip):
+        durations = []
+        for index in range(adds):
+            started = time.perf_counter()
+            library_db.add_book(conn, f"Benchmark Book {index}", "Benchmark Author", 2000, "Fiction", False)
+            durations.append((time.perf_counter() - started) * 1000)
+        results["add_book"] = {
+            "runs": adds,
+            "min_ms": min(durations),
+            "median_ms": statistics.median(durations),
+            "mean_ms": statistics.fmean(durations),
+        }
+        print(f"  {'add_book':<40} {results['add_book']['median_ms']:>10.2f} ms", flush=True)
+
+    name = "search_books fuzzy (after a write)"
+    if not any(name.startswith(prefix) for prefix in skip):
+        # Each write bumps the data version, so every search first refreshes the trigram index.
+        durations = []
+        for index in range(adds):
+            library_db.add_book(conn, f"Fuzzy Refresh Book {index}", "Benchmark Author", 2000, "Fiction", False)
+            started = time.perf_counter()
+            library_db.search_books.uncached(conn, "silnet rivr", "Title", 10, fuzzy=True)
+            durations.append((time.perf_counter() - started) * 1000)
+        results[name] = {
+            "runs": adds,
+            "min_ms": min(durations),
+            "median_ms": statistics.median(durations),
+            "mean_ms": statistics.fmean(durations),
+        }
+        print(f"  {name:<40} {results[name]['median_ms']:>10.2f} ms", flush=True)
+
+    writer = WriteQueue(path)
+    # Every run adds new titles, since the write queue turns away books already stored.
+    queued_titles = (f"Queued Book {index}" for index in itertools.count())
+
+    def queued_adds():
+        futures = [writer.add_book(next(queued_titles), "Benchmark Author", 2000, "Fiction", False)
+                   for _ in range(adds)]
+        for future in futures:
+            future.result()
+
+    record(f"add_book x{adds} (write queue)", queued_adds)
+    writer.close()
+    # The journal only holds the benchmark's own writes, so this times one page of them.
+    record("changes_since", lambda: change_log.changes_since.uncached(conn, 0))
+    conn.close()
+    return results
+
+
+def compare(results, baseline, threshold, noise_ms):
+    """Return (size, operation, baseline ms, current ms) for every regression."""
+    regressions = []
+    for size, operations in results["results"].items():
+        for name, stats in operations.items():
+            previous = baseline.get("results", {}).get(size, {}).get(name)
+            if previous is None:
+                continue
+            before, after = previous["median_ms"], stats["median_ms"]
+            if after > before * (1 + threshold) and after - before > noise_ms:
+                regressions.append((size, name, before, after))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the library data layer.")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma separated library sizes (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per operation")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip", action="append", default=[], help="skip operations starting with this name")
+    parser.add_argument("--regenerate", action="store_true", help="rebuild cached synthetic libraries")
+    parser.add_argument("--output", default="bench_results.json", help="where to write results")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--save-baseline", metavar="PATH", help="also write the results to PATH as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, as a fraction (default: %(default)s)")
+    parser.add_argument("--noise-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+
+    for size in sizes:
+        print(f"{size:,} books", flush=True)
+        results["results"][str(size)] = benchmark_size(size, args.seed, args.repeat, args.skip, args.regenerate)
+
+    with open(args.output, "w") as out:
+        json.dump(results, out, indent=2)
+    print(f"Wrote {args.output}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as out:
+            json.dump(results, out, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline, args.threshold, args.noise_ms)
+        if regressions:
+            print("Regressions against baseline:")
+            for size, name, before, after in regressions:
+                print(f"  {size:>10} {name:<40} {before:.2f} ms -> {after:.2f} ms ({after / before - 1:+.0%})")
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""Report the Streamlit app's cold start and per-rerun cost, page by page.
+
+Every page is measured in a fresh Python process that drives the app with
+Streamlit's AppTest, so imports are paid the way a newly started server
+pays them. In each process the app is run once (the cold start, which
+shows the Home page), switched to the page (its first visit), and rerun
+``--reruns`` times. Where the app records its own phases (see
+startup_timing.py), imports, setup and page render are reported too.
+
+    python -m benchmarks.startup_report --db benchmarks/data/bench-100000.db
+    python -m benchmarks.startup_report --app /path/to/older/app.py --output before.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["Home", "Add Book", "Remove Book", "Search Books", "View All Books", "Duplicates", "Statistics"]
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow"]
+
+
+def measure_page(app_path, page, reruns):
+    """Run inside the child process; returns the measurements of one page."""
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    test = AppTest.from_file(app_path, default_timeout=300)
+    test.run()
+    cold_ms = (time.perf_counter() - started) * 1000
+    if test.exception:
+        raise RuntimeError(f"app failed on its first run: {test.exception[0].message}")
+
+    started = time.perf_counter()
+    if page != PAGES[0]:
+        test.sidebar.radio[0].set_value(page)
+    test.run()
+    first_visit_ms = (time.perf_counter() - started) * 1000
+
+    rerun_ms = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        test.run()
+        rerun_ms.append((time.perf_counter() - started) * 1000)
+
+    result = {
+        "page": page,
+        "cold_start_ms": cold_ms,
+        "first_visit_ms": first_visit_ms,
+        "rerun_ms": statistics.median(rerun_ms) if rerun_ms else None,
+        "modules": len(sys.modules),
+        "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+    timer = getattr(sys.modules.get("startup_timing"), "STARTUP_TIMER", None)
+    if timer is not None:
+        result["cold_start_phases"] = timer.cold_start
+        result["rerun_phases"] = next((row for row in timer.summary() if row["page"] == page), None)
+    return result
+
+
+def run_child(app_path, page, reruns, workdir):
+    command = [sys.executable, "-m", "benchmarks.startup_report", "--child", page,
+               "--app", app_path, "--reruns", str(reruns)]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.path.dirname(app_path),
+                                                                    os.environ.get("PYTHONPATH")])))
+    completed = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{page}: {completed.stderr.strip().splitlines()[-1] if completed.stderr else 'failed'}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def print_report(results):
+    print(f"{'page':<16} {'cold start':>11} {'first visit':>12} {'rerun':>9}  modules  heavy imports")
+    for result in results:
+        rerun = f"{result['rerun_ms']:.0f} ms" if result["rerun_ms"] is not None else "-"
+        print(f"{result['page']:<16} {result['cold_start_ms']:>8.0f} ms {result['first_visit_ms']:>9.0f} ms "
+              f"{rerun:>9}  {result['modules']:>7}  {', '.join(result['heavy_modules']) or '-'}")
+    phases = [result for result in results if result.get("rerun_phases")]
+    if phases:
+        cold = results[0].get("cold_start_phases") or {}
+        print("\ncold start phases: " + ", ".join(f"{name} {value:.1f} ms" for name, value in cold.items()
+                                                  if isinstance(value, float)))
+        print("rerun phases (median):")
+        for result in phases:
+            row = result["rerun_phases"]
+            print(f"  {result['page']:<16} " + ", ".join(f"{name} {value:.1f} ms" for name, value in row.items()
+                                                      if isinstance(value, float)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the Streamlit app's cold start and reruns.")
+    parser.add_argument("--app", default=os.path.join(ROOT, "app.py"), help="app script (default: %(default)s)")
+    parser.add_argument("--db", help="library database to copy in as library.db (default: an empty library)")
+    parser.add_argument("--pages", default=",".join(PAGES), help="comma separated pages (default: all)")
+    parser.add_argument("--reruns", type=int, default=5, help="reruns timed per page")
+    parser.add_argument("--output", help="also write the results as JSON to this file")
+    parser.add_argument("--child", metavar="PAGE", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    app_path = os.path.abspath(args.app)
+
+    if args.child:
+        sys.path.insert(0, os.path.dirname(app_path))
+        print(json.dumps(measure_page(app_path, args.child, args.reruns)))
+        return 0
+
+    results = []
+    for page in [page for page in args.pages.split(",") if page]:
+        with tempfile.TemporaryDirectory() as workdir:
+            if args.db:
+                shutil.copyfile(args.db, os.path.join(workdir, "library.db"))
+            results.append(run_child(app_path, page, args.reruns, workdir))
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(results, out, indent=2)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
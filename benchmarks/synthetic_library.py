@@ -0,0 +1,167 @@
+"""Generate synthetic libraries with a realistic skew for benchmarking.
+
+Authors and genres follow a Zipf-like distribution (a few prolific authors
+and popular genres, a long tail of rare ones), titles are built from a
+small vocabulary so common words repeat the way they do in real catalogs,
+and publication years cluster around recent decades.
+
+Books are written into a table with the original, pre-migration schema,
+so opening the result with ``init_db`` exercises the full upgrade path.
+
+    python -m benchmarks.synthetic_library library-100k.db --rows 100000
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+GENRES = [
+    "Fiction", "Mystery", "Fantasy", "Science Fiction", "Romance", "Thriller",
+    "Biography", "History", "Horror", "Young Adult", "Classics", "Poetry",
+    "Self-Help", "Philosophy", "Travel", "Science", "Cooking", "Graphic Novel",
+    "Memoir", "Drama", "Adventure", "Humor", "Religion", "Art", "Business",
+]
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda",
+    "William", "Elizabeth", "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica",
+    "Thomas", "Sarah", "Charles", "Karen", "Haruki", "Chimamanda", "Gabriel", "Isabel",
+    "Fyodor", "Leo", "Jane", "Virginia", "Toni", "Ursula", "Kazuo", "Zadie",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+    "Rodriguez", "Martinez", "Hernandez", "Lopez", "Wilson", "Anderson", "Thomas", "Taylor",
+    "Moore", "Jackson", "Martin", "Lee", "Murakami", "Adichie", "Marquez", "Allende",
+    "Dostoevsky", "Tolstoy", "Austen", "Woolf", "Morrison", "Le Guin", "Ishiguro", "Smith-Jones",
+]
+ADJECTIVES = [
+    "Silent", "Lost", "Hidden", "Last", "Broken", "Golden", "Dark", "Forgotten",
+    "Burning", "Endless", "Secret", "Crimson", "Wild", "Quiet", "Distant", "Shattered",
+]
+NOUNS = [
+    "River", "Kingdom", "Garden", "Shadow", "House", "Winter", "Ocean", "Crown",
+    "Letter", "Mountain", "Empire", "Promise", "Storm", "Library", "Mirror", "Road",
+    "Harvest", "Island", "Witness", "Night", "Voyage", "Dream", "Machine", "Song",
+]
+TITLE_PATTERNS = [
+    "The {adjective} {noun}",
+    "{noun} of {noun2}",
+    "The {noun} and the {noun2}",
+    "A {adjective} {noun}",
+    "{adjective} {noun}s",
+    "The {noun} of the {adjective} {noun2}",
+]
+
+LEGACY_SCHEMA = '''
+CREATE TABLE books (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    publication_year INTEGER,
+    genre TEXT,
+    read_status INTEGER,
+    date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+'''
+
+
+def zipf_weights(count, exponent=1.1):
+    return list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def make_authors(count):
+    """Distinct author names; once first/last combinations run out, middle initials tell them apart."""
+    combinations = len(FIRST_NAMES) * len(LAST_NAMES)
+    authors = []
+    for index in range(count):
+        first = FIRST_NAMES[index % len(FIRST_NAMES)]
+        last = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+        generation = index // combinations
+        if generation == 0:
+            authors.append(f"{first} {last}")
+        else:
+            initials = ""
+            while generation:
+                generation, letter = divmod(generation - 1, 26)
+                initials = chr(ord("A") + letter) + initials
+            authors.append(f"{first} {'. '.join(initials)}. {last}")
+    return authors
+
+
+def generate_books(count, seed=42, batch_size=50000):
+    """Yield lists of (title, author, publication_year, genre, read_status, date_added) tuples."""
+    rng = random.Random(seed)
+
+    author_count = max(50, count // 8)
+    authors = make_authors(author_count)
+    rng.shuffle(authors)
+    author_weights = zipf_weights(author_count)
+    genre_weights = zipf_weights(len(GENRES), exponent=0.9)
+
+    current_year = datetime.now().year
+    start = datetime.now() - timedelta(days=5 * 365)
+    seconds_per_book = max(1, (5 * 365 * 86400) // max(count, 1))
+
+    produced = 0
+    while produced < count:
+        size = min(batch_size, count - produced)
+        batch_authors = rng.choices(authors, cum_weights=author_weights, k=size)
+        batch_genres = rng.choices(GENRES, cum_weights=genre_weights, k=size)
+        batch = []
+        for offset in range(size):
+            title = rng.choice(TITLE_PATTERNS).format(
+                adjective=rng.choice(ADJECTIVES), noun=rng.choice(NOUNS), noun2=rng.choice(NOUNS)
+            )
+            # Triangular around the last few decades with a long tail back to the 1800s.
+            year = int(rng.triangular(1800, current_year, current_year - 15))
+            date_added = start + timedelta(seconds=(produced + offset) * seconds_per_book)
+            batch.append((
+                title,
+                batch_authors[offset],
+                year,
+                batch_genres[offset],
+                1 if rng.random() < 0.4 else 0,
+                date_added.strftime("%Y-%m-%d %H:%M:%S"),
+            ))
+        produced += size
+        yield batch
+
+
+def create_library(path, count, seed=42):
+    """Write a synthetic library of ``count`` books to a new database file at ``path``."""
+    for leftover in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute(LEGACY_SCHEMA)
+    for batch in generate_books(count, seed):
+        conn.executemany('''
+        INSERT INTO books (title, author, publication_year, genre, read_status, date_added)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', batch)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic library database.")
+    parser.add_argument("path", help="database file to create (overwritten if it exists)")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    create_library(args.path, args.rows, args.seed)
+    print(f"Wrote {args.rows} books to {args.path} in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""HTML rendering of book cards with a bounded, version-aware cache."""
+
+import html
+import threading
+from collections import OrderedDict
+
+
+def render_book_card(book):
+    read_status_text = "Read" if book['read_status'] else "Unread"
+    status_class = "status-read" if book['read_status'] else "status-unread"
+    return (
+        '<div class="book-card">'
+        f"<h3>{html.escape(str(book['title']))}</h3>"
+        f"<p><strong>by {html.escape(str(book['author']))}</strong></p>"
+        f"<p>Year: {html.escape(str(book['publication_year']))} | Genre: {html.escape(str(book['genre']))}</p>"
+        f'<p>Status: <span class="{status_class}">{read_status_text}</span></p>'
+        "</div>"
+    )
+
+
+class BookCardRenderer:
+    """Caches card HTML per book id together with the row version it was rendered from.
+
+    Every change to a book bumps its ``row_version``, so a stale card is
+    simply re-rendered on its next lookup; ``invalidate`` frees the entries
+    of deleted books early. The least recently used cards are evicted once
+    ``maxsize`` is reached.
+    """
+
+    def __init__(self, maxsize=5000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cards = OrderedDict()
+        self._lock = threading.Lock()
+
+    def card(self, book):
+        book_id, version = book['id'], book.get('row_version', 0)
+        with self._lock:
+            entry = self._cards.get(book_id)
+            if entry is not None and entry[0] == version:
+                self._cards.move_to_end(book_id)
+                self.hits += 1
+                return entry[1]
+
+        card_html = render_book_card(book)
+        with self._lock:
+            self.misses += 1
+            self._cards[book_id] = (version, card_html)
+            self._cards.move_to_end(book_id)
+            while len(self._cards) > self.maxsize:
+                self._cards.popitem(last=False)
+        return card_html
+
+    def grid(self, books):
+        """Render every card into a single grid so a page costs one element."""
+        return '<div class="book-grid">%s</div>' % "".join(self.card(book) for book in books)
+
+    def invalidate(self, book_ids):
+        with self._lock:
+            for book_id in book_ids:
+                self._cards.pop(book_id, None)
@@ -0,0 +1,126 @@
+"""Stream the catalog out of the library as CSV, JSON Lines or Parquet.
+
+Rows are read from the database in batches and written straight to the
+output, so memory use stays flat however large the library is.
+
+    python bulk_export.py catalog.parquet --genre Fantasy --sort-by author
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+
+from library_db import BOOK_COLUMNS, DB_PATH, SORT_COLUMNS, init_db, iter_books
+
+EXPORT_FORMATS = {
+    "csv": {"extension": ".csv", "mime": "text/csv"},
+    "jsonl": {"extension": ".jsonl", "mime": "application/x-ndjson"},
+    "parquet": {"extension": ".parquet", "mime": "application/vnd.apache.parquet"},
+}
+DEFAULT_BATCH_SIZE = 5000
+
+# row_version is internal bookkeeping and not part of the catalog.
+EXPORT_COLUMNS = [column for column in BOOK_COLUMNS if column != "row_version"]
+
+
+def _parquet_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.int64()),
+        ("title", pa.string()),
+        ("author", pa.string()),
+        ("publication_year", pa.int64()),
+        ("genre", pa.string()),
+        ("read_status", pa.bool_()),
+        ("date_added", pa.string()),
+    ])
+
+
+def export_books(conn, out, fmt, sort_by="title", genres=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Write matching books to the binary stream ``out`` and return how many were written."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+
+    read_status_index = EXPORT_COLUMNS.index("read_status")
+    written = 0
+
+    if fmt == "csv":
+        text = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+        writer = csv.writer(text)
+        writer.writerow(EXPORT_COLUMNS)
+        for rows in iter_books(conn, sort_by, genres, batch_size, EXPORT_COLUMNS):
+            writer.writerows(rows)
+            written += len(rows)
+        text.detach()
+
+    elif fmt == "jsonl":
+        for rows in iter_books(conn, sort_by, genres, batch_size, EXPORT_COLUMNS):
+            lines = []
+            for row in rows:
+                book = dict(zip(EXPORT_COLUMNS, row))
+                book["read_status"] = bool(row[read_status_index])
+                lines.append(json.dumps(book, ensure_ascii=False))
+            out.write(("\n".join(lines) + "\n").encode("utf-8"))
+            written += len(rows)
+
+    else:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        schema = _parquet_schema()
+        with pq.ParquetWriter(out, schema) as writer:
+            for rows in iter_books(conn, sort_by, genres, batch_size, EXPORT_COLUMNS):
+                columns = [list(column) for column in zip(*rows)]
+                columns[read_status_index] = [None if value is None else bool(value)
+                                              for value in columns[read_status_index]]
+                writer.write_batch(pa.record_batch(columns, schema=schema))
+                written += len(rows)
+
+    return written
+
+
+def export_to_temporary_file(conn, fmt, sort_by="title", genres=None):
+    """Export to an anonymous temporary file on disk and return it rewound for reading."""
+    out = tempfile.TemporaryFile()
+    export_books(conn, out, fmt, sort_by, genres)
+    out.seek(0)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export books from the library database.")
+    parser.add_argument("path", help="output file, or - for standard output")
+    parser.add_argument("--db", default=DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), help="override detection by extension")
+    parser.add_argument("--genre", action="append", dest="genres", help="only export this genre (repeatable)")
+    parser.add_argument("--sort-by", choices=SORT_COLUMNS, default="title")
+    args = parser.parse_args(argv)
+
+    fmt = args.format
+    if fmt is None:
+        extension = os.path.splitext(args.path)[1].lower()
+        fmt = next((name for name, info in EXPORT_FORMATS.items() if info["extension"] == extension), "csv")
+
+    conn = init_db(args.db)
+    try:
+        if args.path == "-":
+            written = export_books(conn, sys.stdout.buffer, fmt, args.sort_by, args.genres)
+        else:
+            with open(args.path, "wb") as out:
+                written = export_books(conn, out, fmt, args.sort_by, args.genres)
+    finally:
+        conn.close()
+
+    print(f"Exported {written} books", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""Stream books from CSV, JSON Lines or Parquet files into the library.
+
+Records are read in chunks, checked with the Add Book form's rules and
+inserted a batch per transaction. Books already in the library, or earlier
+in the same file, are rejected as duplicates unless duplicates are allowed. Progress is checkpointed in the same
+transaction as each batch, so an interrupted import resumes after the
+last committed batch when it is run again.
+
+    python bulk_import.py catalog.csv --batch-size 10000 --rejects rejected.csv
+"""
+
+import argparse
+import csv
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+
+from library_db import DB_PATH, init_db, add_books, book_key, find_duplicate, validate_book
+from query_cache import QUERY_CACHE
+
+BOOK_FIELDS = ["title", "author", "publication_year", "genre", "read_status"]
+FORMATS = {
+    ".csv": "csv",
+    ".json": "json",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".parquet": "parquet",
+}
+DEFAULT_BATCH_SIZE = 5000
+
+READ_VALUES = {"1", "true", "yes", "y", "read"}
+UNREAD_VALUES = {"", "0", "false", "no", "n", "unread"}
+
+
+@dataclass
+class BatchResult:
+    number: int
+    imported: int
+    rejected: int
+    seconds: float
+
+    @property
+    def rows_per_second(self):
+        return (self.imported + self.rejected) / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    rejected: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+    batches: list = field(default_factory=list)
+
+    @property
+    def rows_per_second(self):
+        return (self.imported + self.rejected) / self.seconds if self.seconds else 0.0
+
+
+def detect_format(name):
+    extension = os.path.splitext(name)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported file type '{extension}'. Use one of: {', '.join(FORMATS)}")
+    return FORMATS[extension]
+
+
+def read_records(stream, fmt, chunk_size=DEFAULT_BATCH_SIZE):
+    """Yield dict records from a binary stream without loading the whole file.
+
+    Plain ``.json`` files holding a single array are the exception: the
+    standard library cannot parse an array incrementally, so use JSON Lines
+    for very large exports.
+    """
+    if fmt == "csv":
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        yield from csv.DictReader(text)
+    elif fmt in ("json", "jsonl"):
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig")
+        first_line = text.readline()
+        if fmt == "json" and first_line.lstrip().startswith("["):
+            yield from json.loads(first_line + text.read())
+            return
+        for line in itertools.chain([first_line], text):
+            if line.strip():
+                yield json.loads(line)
+    elif fmt == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet import requires pyarrow (pip install pyarrow)")
+        parquet_file = pq.ParquetFile(stream)
+        columns = [name for name in BOOK_FIELDS if name in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield from batch.to_pylist()
+    else:
+        raise ValueError(f"Unsupported format '{fmt}'")
+
+
+def clean_record(record):
+    """Return (book tuple, None) for a valid record or (None, reason) for a rejected one."""
+    def text(name):
+        value = record.get(name)
+        return str(value).strip() if value is not None else ""
+
+    title, author, genre = text("title"), text("author"), text("genre")
+
+    publication_year = record.get("publication_year")
+    try:
+        if publication_year is not None and publication_year != "":
+            year_float = float(publication_year)
+            publication_year = int(year_float) if year_float.is_integer() else None
+        else:
+            publication_year = None
+    except (TypeError, ValueError):
+        publication_year = None
+
+    read_status = record.get("read_status")
+    if not isinstance(read_status, (bool, int)):
+        status_text = text("read_status").lower()
+        if status_text in READ_VALUES:
+            read_status = True
+        elif status_text in UNREAD_VALUES:
+            read_status = False
+        else:
+            return None, f"Unrecognised read_status '{record.get('read_status')}'."
+
+    error = validate_book(title, author, publication_year, genre)
+    if error:
+        return None, error
+    return (title, author, publication_year, genre, bool(read_status)), None
+
+
+def get_checkpoint(conn, source):
+    row = conn.execute(
+        "SELECT records_done, imported, rejected FROM import_checkpoints WHERE source = ?", (source,)
+    ).fetchone()
+    return row if row else (0, 0, 0)
+
+
+def clear_checkpoint(conn, source):
+    conn.execute("DELETE FROM import_checkpoints WHERE source = ?", (source,))
+    conn.commit()
+
+
+def import_books(conn, stream, fmt, source, batch_size=DEFAULT_BATCH_SIZE,
+                 on_batch=None, on_reject=None, restart=False, allow_duplicates=False):
+    """Import every record of ``stream`` and return an ImportReport.
+
+    ``source`` identifies the file for checkpointing. ``on_batch`` is called
+    with a BatchResult after each commit, ``on_reject`` with
+    (record number, record, reason) for every rejected record.
+    """
+    if restart:
+        clear_checkpoint(conn, source)
+    records_done, imported, rejected = get_checkpoint(conn, source)
+
+    report = ImportReport(skipped=records_done)
+    records = itertools.islice(read_records(stream, fmt, batch_size), records_done, None)
+    record_number = records_done
+    started = time.perf_counter()
+
+    for batch_number in itertools.count(1):
+        chunk = list(itertools.islice(records, batch_size))
+        if not chunk:
+            break
+
+        batch_started = time.perf_counter()
+        books = []
+        batch_keys = {}
+        batch_rejected = 0
+        for record in chunk:
+            record_number += 1
+            book, reason = clean_record(record)
+            if book is not None and not allow_duplicates:
+                key = book_key(*book[:3])
+                duplicate_id = find_duplicate(conn, *book[:3])
+                if duplicate_id is not None:
+                    book, reason = None, f"Already in the library as book #{duplicate_id}."
+                elif key in batch_keys:
+                    book, reason = None, f"Duplicate of record {batch_keys[key]}."
+                else:
+                    batch_keys[key] = record_number
+            if book is None:
+                batch_rejected += 1
+                if on_reject:
+                    on_reject(record_number, record, reason)
+            else:
+                books.append(book)
+
+        if add_books(conn, books, commit=False) is None:
+            raise RuntimeError(f"Batch {batch_number} failed; resume from record {records_done + 1}.")
+        imported += len(books)
+        rejected += batch_rejected
+        records_done = record_number
+        conn.execute('''
+        INSERT INTO import_checkpoints (source, records_done, imported, rejected, updated_at)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (source) DO UPDATE SET
+            records_done = excluded.records_done,
+            imported = excluded.imported,
+            rejected = excluded.rejected,
+            updated_at = excluded.updated_at
+        ''', (source, records_done, imported, rejected))
+        conn.commit()
+        QUERY_CACHE.invalidate(conn)
+
+        batch = BatchResult(batch_number, len(books), batch_rejected, time.perf_counter() - batch_started)
+        report.batches.append(batch)
+        report.imported += batch.imported
+        report.rejected += batch.rejected
+        if on_batch:
+            on_batch(batch)
+
+    clear_checkpoint(conn, source)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def checkpoint_key(name, size):
+    return f"{os.path.basename(name)}:{size}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import books into the library database.")
+    parser.add_argument("path", help="CSV, JSON, JSON Lines or Parquet file")
+    parser.add_argument("--db", default=DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--format", choices=sorted(set(FORMATS.values())), help="override detection by extension")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per transaction")
+    parser.add_argument("--rejects", help="write rejected records with the reason to this CSV file")
+    parser.add_argument("--restart", action="store_true", help="ignore any saved checkpoint and start over")
+    parser.add_argument("--allow-duplicates", action="store_true", help="import books that are already in the library")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or detect_format(args.path)
+    source = checkpoint_key(args.path, os.path.getsize(args.path))
+    conn = init_db(args.db)
+
+    rejects_file = open(args.rejects, "a", newline="", encoding="utf-8") if args.rejects else None
+    rejects_writer = csv.writer(rejects_file) if rejects_file else None
+
+    def on_reject(record_number, record, reason):
+        if rejects_writer:
+            rejects_writer.writerow([record_number] + [record.get(name, "") for name in BOOK_FIELDS] + [reason])
+
+    def on_batch(batch):
+        print(f"batch {batch.number}: {batch.imported} imported, {batch.rejected} rejected "
+              f"in {batch.seconds:.2f}s ({batch.rows_per_second:,.0f} rows/s)")
+
+    done, _, _ = get_checkpoint(conn, source)
+    if done and not args.restart:
+        print(f"Resuming {args.path} after record {done}")
+
+    try:
+        with open(args.path, "rb") as stream:
+            report = import_books(conn, stream, fmt, source, args.batch_size,
+                                  on_batch=on_batch, on_reject=on_reject, restart=args.restart,
+                                  allow_duplicates=args.allow_duplicates)
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume.", file=sys.stderr)
+        return 130
+    finally:
+        if rejects_file:
+            rejects_file.close()
+        conn.close()
+
+    print(f"Imported {report.imported} books, rejected {report.rejected} "
+          f"in {report.seconds:.1f}s ({report.rows_per_second:,.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
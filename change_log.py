@@ -0,0 +1,160 @@
+"""Incremental sync from the change journal.
+
+Triggers on book_rows append every insert, edit and delete of a book to
+``book_changes``, in the same transaction as the write (see
+_create_change_journal in library_db). Sequence numbers only grow, and
+with a single writer they become visible in order, so a consumer such as
+a search cache or a nightly warehouse copy never has to reread the
+table: it notes latest_change(), reads everything once, and from then on
+asks for changes_since() the last sequence number it applied. Each
+change carries the book as it is now, or None once it is deleted, so
+applying a page of changes is an upsert or a delete per book.
+
+compact_changes() drops entries older than the retention window. A
+consumer that last synced before the compacted range gets ``resync`` and
+has to read everything again.
+
+    python change_log.py since 1200 --limit 100
+    python change_log.py compact --days 30
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+from dataclasses import dataclass, field
+
+from library_db import BOOK_COLUMNS, COLUMN_EXPRESSIONS, DB_PATH, init_db
+from profiling import profiled
+from query_cache import QUERY_CACHE, cached_query
+
+DEFAULT_RETENTION_DAYS = 30
+CHANGES_PAGE_SIZE = 1000
+
+
+@dataclass
+class ChangeBatch:
+    # (seq, book_id, operation, changed_at, book row or None) per change, oldest first.
+    changes: list = field(default_factory=list)
+    # Pass as ``since`` to get the changes after this batch.
+    next_seq: int = 0
+    more: bool = False
+    resync: bool = False
+
+
+@profiled
+@cached_query
+def latest_change(conn):
+    """The sequence number of the newest change, or 0 before the first one."""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'book_changes'").fetchone()
+    return row[0] if row else 0
+
+
+@profiled
+@cached_query
+def changes_since(conn, since, limit=CHANGES_PAGE_SIZE):
+    """Up to ``limit`` changes with a sequence number above ``since``, as a ChangeBatch.
+
+    If compaction removed changes after ``since``, the batch is empty,
+    ``resync`` is set and ``next_seq`` is the newest change, to continue
+    from after reading everything again.
+    """
+    if since < 0:
+        raise ValueError("since must not be negative")
+    compacted_through = conn.execute("SELECT compacted_through FROM change_journal_state").fetchone()[0]
+    if since < compacted_through:
+        return ChangeBatch(next_seq=latest_change.uncached(conn), resync=True)
+
+    columns = ", ".join(COLUMN_EXPRESSIONS[column] for column in BOOK_COLUMNS)
+    rows = conn.execute(f'''
+    SELECT changes.seq, changes.book_id, changes.operation, changes.changed_at, {columns}
+    FROM book_changes AS changes
+    LEFT JOIN book_rows ON book_rows.id = changes.book_id
+    LEFT JOIN authors ON authors.id = book_rows.author_id
+    LEFT JOIN genres ON genres.id = book_rows.genre_id
+    WHERE changes.seq > ?
+    ORDER BY changes.seq
+    LIMIT ?
+    ''', (since, limit + 1)).fetchall()
+
+    batch = ChangeBatch(next_seq=since, more=len(rows) > limit)
+    for row in rows[:limit]:
+        book = row[4:] if row[4] is not None else None
+        batch.changes.append((row[0], row[1], row[2], row[3], book))
+        batch.next_seq = row[0]
+    return batch
+
+
+@profiled
+def compact_changes(conn, retention_days=DEFAULT_RETENTION_DAYS):
+    """Delete journal entries older than ``retention_days``; returns how many, or None on error."""
+    if retention_days < 0:
+        raise ValueError("retention_days must not be negative")
+    cursor = conn.cursor()
+    try:
+        # Sequence numbers grow with time, so the expired entries are the ones before the first kept one.
+        cursor.execute('''
+        SELECT seq FROM book_changes WHERE changed_at >= datetime('now', ?) ORDER BY seq LIMIT 1
+        ''', (f"-{retention_days} days",))
+        row = cursor.fetchone()
+        through = row[0] - 1 if row else latest_change.uncached(conn)
+        cursor.execute("DELETE FROM book_changes WHERE seq <= ?", (through,))
+        deleted = cursor.rowcount
+        cursor.execute("UPDATE change_journal_state SET compacted_through = MAX(compacted_through, ?)", (through,))
+        conn.commit()
+        QUERY_CACHE.invalidate(conn)
+        return deleted
+    except sqlite3.Error:
+        conn.rollback()
+        return None
+
+
+@profiled
+@cached_query
+def journal_summary(conn):
+    """(entries, oldest seq, newest seq, compacted through) of the journal."""
+    entries, oldest = conn.execute("SELECT COUNT(*), MIN(seq) FROM book_changes").fetchone()
+    compacted_through = conn.execute("SELECT compacted_through FROM change_journal_state").fetchone()[0]
+    return entries, oldest, latest_change.uncached(conn), compacted_through
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read or compact the library's change journal.")
+    parser.add_argument("--db", default=DB_PATH, help="database file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    since_parser = commands.add_parser("since", help="print the changes after a sequence number as JSON lines")
+    since_parser.add_argument("seq", type=int)
+    since_parser.add_argument("--limit", type=int, default=CHANGES_PAGE_SIZE)
+    compact_parser = commands.add_parser("compact", help="drop entries older than the retention window")
+    compact_parser.add_argument("--days", type=int, default=DEFAULT_RETENTION_DAYS,
+                                help="days of changes to keep (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if args.command == "since" and args.seq < 0:
+        parser.error("seq must not be negative")
+
+    conn = init_db(args.db)
+    try:
+        if args.command == "compact":
+            deleted = compact_changes(conn, args.days)
+            if deleted is None:
+                print("Compaction failed.", file=sys.stderr)
+                return 1
+            print(f"Removed {deleted} changes older than {args.days} days")
+            return 0
+
+        batch = changes_since(conn, args.seq, args.limit)
+        if batch.resync:
+            print(f"Changes after {args.seq} were compacted; read everything and continue from {batch.next_seq}.",
+                  file=sys.stderr)
+            return 2
+        for seq, book_id, operation, changed_at, book in batch.changes:
+            print(json.dumps({"seq": seq, "operation": operation, "book_id": book_id, "changed_at": changed_at,
+                              "book": dict(zip(BOOK_COLUMNS, book)) if book else None}))
+        print(f"next: {batch.next_seq}{' (more)' if batch.more else ''}", file=sys.stderr)
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Column-oriented, typed reads of the books table for pandas.
+
+Instead of fetching a list of row tuples and handing it to
+``pd.DataFrame`` (which keeps every value as a Python object), rows are
+streamed from the cursor into typed column buffers: authors and genres
+become categorical codes, publication years int16, read status bool.
+Frames built this way take a fraction of the memory and support
+vectorized transforms in place of per-row ``apply`` calls.
+"""
+
+import numpy as np
+import pandas as pd
+
+from library_db import BOOK_COLUMNS, iter_books
+
+FRAME_COLUMNS = [column for column in BOOK_COLUMNS if column != "row_version"]
+
+
+class _Int64Column:
+    def __init__(self):
+        self.chunks = []
+
+    def extend(self, values):
+        self.chunks.append(np.fromiter((0 if value is None else value for value in values),
+                                       dtype=np.int64, count=len(values)))
+
+    def finish(self):
+        return np.concatenate(self.chunks) if self.chunks else np.empty(0, dtype=np.int64)
+
+
+class _YearColumn:
+    def __init__(self):
+        self.values = []
+        self.missing = []
+
+    def extend(self, values):
+        # None becomes NaN, which doubles as the missing-value mask.
+        as_float = np.array(values, dtype=np.float64)
+        missing = np.isnan(as_float)
+        self.values.append(np.where(missing, 0, as_float).astype(np.int16))
+        self.missing.append(missing)
+
+    def finish(self):
+        if not self.values:
+            return pd.array([], dtype="Int16")
+        return pd.arrays.IntegerArray(np.concatenate(self.values), np.concatenate(self.missing))
+
+
+class _BoolColumn:
+    def __init__(self):
+        self.chunks = []
+
+    def extend(self, values):
+        self.chunks.append(np.nan_to_num(np.array(values, dtype=np.float64)).astype(bool))
+
+    def finish(self):
+        return np.concatenate(self.chunks) if self.chunks else np.empty(0, dtype=bool)
+
+
+class _CategoryColumn:
+    def __init__(self):
+        self.chunks = []
+        self.index = {}
+
+    def extend(self, values):
+        # Factorize the batch, then translate its few distinct values into the shared codes.
+        batch_codes, uniques = pd.factorize(np.array(values, dtype=object), use_na_sentinel=True)
+        index = self.index
+        translation = np.array([index.setdefault(value, len(index)) for value in uniques] + [-1], dtype=np.int32)
+        self.chunks.append(translation[batch_codes])
+
+    def finish(self):
+        codes = np.concatenate(self.chunks) if self.chunks else np.empty(0, dtype=np.int32)
+        return pd.Categorical.from_codes(codes, categories=list(self.index))
+
+
+class _TextColumn:
+    def __init__(self):
+        self.values = []
+
+    def extend(self, values):
+        self.values.extend(values)
+
+    def finish(self):
+        return pd.array(self.values, dtype="string")
+
+
+class _TimestampColumn(_TextColumn):
+    def finish(self):
+        return pd.to_datetime(pd.Series(self.values, dtype="string"), errors="coerce").to_numpy()
+
+
+COLUMN_TYPES = {
+    "id": _Int64Column,
+    "row_version": _Int64Column,
+    "title": _TextColumn,
+    "author": _CategoryColumn,
+    "publication_year": _YearColumn,
+    "genre": _CategoryColumn,
+    "read_status": _BoolColumn,
+    "date_added": _TimestampColumn,
+}
+
+
+def frame_from_batches(batches, columns):
+    """Build a typed DataFrame from an iterable of row batches in ``columns`` order."""
+    builders = [COLUMN_TYPES.get(column, _TextColumn)() for column in columns]
+    for rows in batches:
+        if not rows:
+            continue
+        for builder, values in zip(builders, zip(*rows)):
+            builder.extend(values)
+    return pd.DataFrame({column: builder.finish() for column, builder in zip(columns, builders)})
+
+
+def frame_from_rows(rows, columns=BOOK_COLUMNS):
+    return frame_from_batches([rows], columns)
+
+
+def books_frame(conn, sort_by="title", genres=None, columns=FRAME_COLUMNS, batch_size=10000):
+    """Read the matching books straight from the cursor into a typed DataFrame."""
+    return frame_from_batches(iter_books(conn, sort_by, genres, batch_size, columns), columns)
+
+
+def read_status_labels(read_status):
+    return np.where(np.asarray(read_status, dtype=bool), "Read", "Unread")
+
+
+def decades(publication_years):
+    return publication_years // 10 * 10
+
+
+STATISTICS_COLUMNS = ["author", "publication_year", "genre", "read_status"]
+
+
+def frame_statistics(df):
+    """The Statistics page's aggregations, computed with vectorized operations on a typed frame.
+
+    Only ``STATISTICS_COLUMNS`` are needed, so load the frame with
+    ``books_frame(conn, columns=STATISTICS_COLUMNS)``.
+    """
+    genre_counts = df["genre"].value_counts()
+    decade_counts = decades(df["publication_year"]).value_counts().sort_index()
+    author_counts = df["author"].value_counts()
+    read_author_counts = df.loc[df["read_status"], "author"].value_counts()
+    return {
+        "genre_counts": genre_counts[genre_counts > 0],
+        "decade_counts": decade_counts,
+        "top_authors": author_counts.head(5),
+        "read_author_counts": read_author_counts[read_author_counts > 0],
+    }
@@ -0,0 +1,271 @@
+"""Find books that were probably entered more than once.
+
+Exact duplicates are turned away when a book is added (see book_key in
+library_db). This finds the near ones: the same book with a typo, a
+plural, a dropped article or the author's name written another way.
+
+Comparing every pair of books is O(n²), far too slow for a large
+library. Candidates come from sorted-neighbourhood blocking instead: the
+books are sorted by a few different keys and each book is compared only
+with the ``window`` books before it in each order. A typo near the start
+of a title moves a book away from its twin when sorting by author and
+title, but not when sorting by author and reversed title; a differently
+written author name is caught by the pass that sorts by title first.
+Two books are duplicates when their titles and authors are similar
+enough and their publication years do not differ, and duplicate pairs
+are joined into groups with union-find. A scan makes O(n * window)
+comparisons.
+
+Groups are stored in ``duplicate_candidates`` for the Duplicates page,
+where each group is merged into one book or marked as distinct books
+(``distinct_books``), which later scans leave apart.
+
+    python dedup.py --db library.db --threshold 0.8
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from fuzzy_index import trigrams, words
+from library_db import BOOK_COLUMNS, DB_PATH, init_db
+from profiling import profiled
+from query_cache import cached_query
+
+DEFAULT_THRESHOLD = 0.75
+DEFAULT_WINDOW = 10
+AUTHOR_THRESHOLD = 0.5
+ARTICLES = {"a", "an", "the"}
+
+
+@dataclass
+class ScanReport:
+    books: int = 0
+    comparisons: int = 0
+    seconds: float = 0.0
+    # (similarity, book ids) per group, largest group first.
+    groups: list = field(default_factory=list)
+
+    @property
+    def duplicates(self):
+        """Books that would go if every group were merged."""
+        return sum(len(book_ids) - 1 for _, book_ids in self.groups)
+
+
+@lru_cache(maxsize=65536)
+def _grams(text):
+    return frozenset().union(*(trigrams(word) for word in text.split()))
+
+
+def _title(title):
+    """The words of ``title`` without a leading article, as compared and sorted here."""
+    title_words = words(title.casefold())
+    if len(title_words) > 1 and title_words[0] in ARTICLES:
+        title_words = title_words[1:]
+    return " ".join(title_words)
+
+
+def _similarity(first, second):
+    """Jaccard similarity of two trigram sets."""
+    shared = len(first & second)
+    return shared / (len(first) + len(second) - shared) if shared else 0.0
+
+
+def _numbers(title):
+    return [word for word in title.split() if word.isdigit()]
+
+
+def _in_same_order(first, second):
+    """Whether the words two titles share appear in the same order, which trigram sets cannot tell."""
+    positions = {}
+    for position, word in enumerate(second.split()):
+        positions.setdefault(word, position)
+    shared = [positions[word] for word in first.split() if word in positions]
+    return all(earlier <= later for earlier, later in zip(shared, shared[1:]))
+
+
+class _Groups:
+    """Union-find over book positions that remembers each group's weakest link."""
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.similarity = {}
+
+    def find(self, position):
+        parent = self.parent
+        while parent[position] != position:
+            parent[position] = parent[parent[position]]
+            position = parent[position]
+        return position
+
+    def union(self, first, second, similarity):
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return
+        self.parent[first] = second
+        self.similarity[second] = min(similarity, self.similarity.pop(first, 1.0), self.similarity.get(second, 1.0))
+
+
+def _load_books(conn):
+    """Ids, titles, author ids and years of every book, plus each author's words in sorted order."""
+    authors = {}
+    for author_id, name in conn.execute("SELECT id, name FROM authors"):
+        authors[author_id] = " ".join(sorted(words(name.casefold())))
+    ids, titles, author_ids, years = [], [], [], []
+    for book_id, title, author_id, year in conn.execute(
+            "SELECT id, title, author_id, publication_year FROM book_rows"):
+        ids.append(book_id)
+        titles.append(_title(title))
+        author_ids.append(author_id)
+        years.append(-1 if year is None else int(year))
+    return ids, titles, author_ids, years, authors
+
+
+@profiled
+def find_near_duplicates(conn, threshold=DEFAULT_THRESHOLD, window=DEFAULT_WINDOW):
+    """Group the library's probable duplicates; returns a ScanReport.
+
+    ``threshold`` is the title similarity, from 0 to 1, two books need to
+    count as duplicates. Pairs recorded in ``distinct_books`` are never
+    joined directly.
+    """
+    started = time.perf_counter()
+    ids, titles, author_ids, years, authors = _load_books(conn)
+    distinct = set(conn.execute("SELECT first_id, second_id FROM distinct_books"))
+    report = ScanReport(books=len(ids))
+
+    passes = [
+        lambda position: (authors[author_ids[position]], years[position], titles[position]),
+        lambda position: (titles[position], years[position], authors[author_ids[position]]),
+        lambda position: (authors[author_ids[position]], years[position], titles[position][::-1]),
+    ]
+    groups = _Groups(len(ids))
+    for sort_key in passes:
+        neighbours = deque(maxlen=window)
+        for position in sorted(range(len(ids)), key=sort_key):
+            grams = _grams(titles[position])
+            for other, other_grams in neighbours:
+                if years[other] != years[position] and -1 not in (years[other], years[position]):
+                    continue
+                report.comparisons += 1
+                # Jaccard similarity can be no higher than the ratio of the set sizes.
+                if min(len(grams), len(other_grams)) < threshold * max(len(grams), len(other_grams)):
+                    continue
+                similarity = _similarity(grams, other_grams)
+                if similarity < threshold or _numbers(titles[position]) != _numbers(titles[other]):
+                    continue
+                if not _in_same_order(titles[position], titles[other]):
+                    continue
+                if author_ids[position] != author_ids[other] and _similarity(
+                        _grams(authors[author_ids[position]]), _grams(authors[author_ids[other]])) < AUTHOR_THRESHOLD:
+                    continue
+                pair = (min(ids[position], ids[other]), max(ids[position], ids[other]))
+                if pair not in distinct:
+                    groups.union(position, other, similarity)
+            neighbours.append((position, grams))
+
+    members = {}
+    for root in groups.similarity:
+        members[root] = []
+    for position in range(len(ids)):
+        root = groups.find(position)
+        if root in members:
+            members[root].append(ids[position])
+    report.groups = sorted(((groups.similarity[root], sorted(book_ids)) for root, book_ids in members.items()),
+                           key=lambda group: (-len(group[1]), group[1][0]))
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+# The writes below do not commit, so they can run on the write queue.
+
+def save_duplicate_groups(conn, groups):
+    """Replace the stored duplicate groups with ``groups`` from a ScanReport."""
+    conn.execute("DELETE FROM duplicate_candidates")
+    conn.executemany("INSERT INTO duplicate_candidates (book_id, group_id, similarity) VALUES (?, ?, ?)",
+                     [(book_id, book_ids[0], similarity) for similarity, book_ids in groups for book_id in book_ids])
+    return len(groups)
+
+
+def dismiss_group(conn, book_ids):
+    """Record that ``book_ids`` are different books and drop them from the stored groups."""
+    book_ids = sorted(book_ids)
+    conn.executemany("INSERT OR IGNORE INTO distinct_books (first_id, second_id) VALUES (?, ?)",
+                     [(first, second) for index, first in enumerate(book_ids) for second in book_ids[index + 1:]])
+    conn.executemany("DELETE FROM duplicate_candidates WHERE book_id = ?", [(book_id,) for book_id in book_ids])
+    return len(book_ids)
+
+
+@profiled
+@cached_query
+def count_duplicate_groups(conn):
+    """(groups, books in them) of the stored duplicate groups that still have two or more books."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+        SELECT COUNT(*), IFNULL(SUM(size), 0) FROM (
+            SELECT COUNT(*) AS size FROM duplicate_candidates GROUP BY group_id HAVING size > 1
+        )
+        ''')
+        return cursor.fetchone()
+    except sqlite3.Error:
+        return (0, 0)
+
+
+@profiled
+@cached_query
+def get_duplicate_groups(conn, limit=10, offset=0):
+    """A page of stored duplicate groups, largest first, as (group_id, similarity, book rows)."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+        SELECT group_id, MIN(similarity) FROM duplicate_candidates
+        GROUP BY group_id HAVING COUNT(*) > 1
+        ORDER BY COUNT(*) DESC, group_id
+        LIMIT ? OFFSET ?
+        ''', (limit, offset))
+        page = cursor.fetchall()
+        if not page:
+            return []
+        books = {group_id: [] for group_id, _ in page}
+        cursor.execute('''
+        SELECT candidates.group_id, %s FROM duplicate_candidates AS candidates
+        JOIN books ON books.id = candidates.book_id
+        WHERE candidates.group_id IN (%s)
+        ORDER BY books.id
+        ''' % (", ".join(f"books.{column}" for column in BOOK_COLUMNS), ", ".join("?" * len(page))),
+                       [group_id for group_id, _ in page])
+        for row in cursor.fetchall():
+            books[row[0]].append(row[1:])
+    except sqlite3.Error:
+        return []
+    return [(group_id, similarity, books[group_id]) for group_id, similarity in page]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find probable duplicate books for review on the Duplicates page.")
+    parser.add_argument("--db", default=DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="title similarity from 0 to 1 that counts as a duplicate (default: %(default)s)")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW,
+                        help="neighbours each book is compared with per pass (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    conn = init_db(args.db)
+    try:
+        report = find_near_duplicates(conn, args.threshold, args.window)
+        save_duplicate_groups(conn, report.groups)
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"Compared {report.books} books in {report.comparisons} comparisons and found "
+          f"{len(report.groups)} groups ({report.duplicates} duplicates) in {report.seconds:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""Typo-tolerant lookup of search words in the full-text index vocabulary.
+
+Rows are never scored directly. Every distinct word the FTS index holds
+for a column is read from the ``books_fts_terms`` vocabulary table and
+split into trigrams, and an inverted index maps each trigram to the words
+containing it. A misspelled query word is resolved by counting shared
+trigrams over the postings of its own few trigrams, which only touches
+words that share something with it, and the closest words are then
+looked up through the regular FTS index.
+
+Indexes are built from the vocabulary on first use and kept per
+database. Rereading the vocabulary scans the whole FTS index, so after a
+write in this process, or once ``ttl`` seconds have passed to pick up
+writes from other processes, only the books changed since are read from
+the change journal (``book_changes``) and their words added. The words of
+deleted or edited books cannot be read back, so once there have been any,
+candidate words are checked against the FTS index before they are
+returned and dropped if no book has them any more. The vocabulary is only
+reread when the journal was compacted past the last refresh or more than
+``JOURNAL_REFRESH_LIMIT`` changes piled up.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+
+from query_cache import QUERY_CACHE, database_key
+
+FUZZY_COLUMNS = ["title", "author", "genre"]
+JOURNAL_REFRESH_LIMIT = 50000
+
+
+def normalize(text):
+    """Lowercase and strip diacritics, the way the FTS tokenizer does."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def words(text):
+    return re.findall(r"\w+", normalize(text))
+
+
+def trigrams(word):
+    """Trigrams of ``word`` padded like pg_trgm, so short words and word starts still match."""
+    padded = f"  {word} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def word_similarity(query, text):
+    """Share of the query's trigrams that also occur in ``text``, from 0 to 1.
+
+    Unlike a symmetric similarity this does not penalize a long title for
+    containing words the query did not mention.
+    """
+    query_trigrams = set().union(*(trigrams(word) for word in words(query)))
+    if not query_trigrams or not text:
+        return 0.0
+    text_trigrams = set().union(*(trigrams(word) for word in words(text)))
+    return len(query_trigrams & text_trigrams) / len(query_trigrams)
+
+
+class TrigramIndex:
+    """Inverted trigram index over one column's vocabulary."""
+
+    def __init__(self):
+        self.words = {}
+        self.postings = defaultdict(set)
+
+    def add(self, word):
+        grams = trigrams(word)
+        self.words[word] = len(grams)
+        for gram in grams:
+            self.postings[gram].add(word)
+
+    def remove(self, word):
+        if self.words.pop(word, None) is None:
+            return
+        for gram in trigrams(word):
+            posting = self.postings.get(gram)
+            if posting is not None:
+                posting.discard(word)
+                if not posting:
+                    del self.postings[gram]
+
+    def update(self, vocabulary):
+        """Bring the index in line with ``vocabulary``, touching only the words that changed."""
+        for word in self.words.keys() - vocabulary:
+            self.remove(word)
+        for word in vocabulary - self.words.keys():
+            self.add(word)
+
+    def closest(self, word, limit=5, threshold=0.3):
+        """The indexed words most similar to ``word`` as (word, similarity), best first."""
+        grams = trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        matches = []
+        for candidate, count in shared.items():
+            score = count / (len(grams) + self.words[candidate] - count)
+            if score >= threshold:
+                matches.append((candidate, score))
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches[:limit]
+
+
+class FuzzyIndexes:
+    """Per-database trigram indexes of the FTS vocabulary, one per column.
+
+    Each database has a lock of its own, held while its index is refreshed
+    or searched, so a refresh never holds up searches of other databases.
+    """
+
+    def __init__(self, ttl=60.0):
+        self.ttl = ttl
+        self._databases = {}
+        self._lock = threading.Lock()
+
+    def closest(self, conn, column, query_words, limit=5):
+        """For each query word, the closest words of ``column`` as in TrigramIndex.closest.
+
+        Returns None if the database has no vocabulary table.
+        """
+        database = database_key(conn)
+        version = QUERY_CACHE.data_version(conn)
+        now = time.monotonic()
+        with self._lock:
+            state = self._databases.setdefault(database, {"lock": threading.Lock(), "columns": None})
+        with state["lock"]:
+            if state["columns"] is None or state["version"] != version or state["expires_at"] <= now:
+                if not self._refresh(conn, state):
+                    return None
+                state["version"] = version
+                state["expires_at"] = now + self.ttl
+            return [self._closest_present(conn, state, column, word, limit) for word in query_words]
+
+    def _closest_present(self, conn, state, column, word, limit):
+        index = state["columns"][column]
+        while True:
+            matches = index.closest(word, limit)
+            if not state["maybe_gone"]:
+                return matches
+            gone = [candidate for candidate, _ in matches if not self._still_indexed(conn, state, column, candidate)]
+            if not gone:
+                return matches
+            for candidate in gone:
+                index.remove(candidate)
+
+    def _still_indexed(self, conn, state, column, word):
+        if (column, word) in state["checked"]:
+            return True
+        # A MATCH stops at the first row; the vocabulary table would count every row with the word.
+        found = conn.execute("SELECT 1 FROM books_fts WHERE books_fts MATCH ? LIMIT 1",
+                             (f'{column} : "{word}"',)).fetchone() is not None
+        if found:
+            state["checked"].add((column, word))
+        return found
+
+    def _refresh(self, conn, state):
+        try:
+            if state["columns"] is not None and self._apply_changes(conn, state):
+                return True
+            self._rebuild(conn, state)
+            return True
+        except sqlite3.Error as error:
+            if getattr(error, "sqlite_errorcode", None) == sqlite3.SQLITE_INTERRUPT:
+                raise
+            return False
+
+    def _rebuild(self, conn, state):
+        # Read the journal position first: a change landing in between is applied again later, which is harmless.
+        seq = _latest_change(conn)
+        vocabulary = defaultdict(set)
+        for term, column in conn.execute("SELECT term, col FROM books_fts_terms"):
+            vocabulary[column].add(term)
+        if state["columns"] is None:
+            state["columns"] = {column: TrigramIndex() for column in FUZZY_COLUMNS}
+        for column, index in state["columns"].items():
+            index.update(vocabulary[column])
+        state["seq"] = seq
+        state["maybe_gone"] = False
+        state["checked"] = set()
+
+    def _apply_changes(self, conn, state):
+        """Add the words of the books changed since the last refresh; False if the vocabulary must be reread."""
+        compacted_through = conn.execute("SELECT compacted_through FROM change_journal_state").fetchone()[0]
+        if state["seq"] < compacted_through or _latest_change(conn) - state["seq"] > JOURNAL_REFRESH_LIMIT:
+            return False
+        rows = conn.execute('''
+        SELECT changes.seq, changes.operation, book_rows.title, authors.name, genres.name
+        FROM book_changes AS changes
+        LEFT JOIN book_rows ON book_rows.id = changes.book_id
+        LEFT JOIN authors ON authors.id = book_rows.author_id
+        LEFT JOIN genres ON genres.id = book_rows.genre_id
+        WHERE changes.seq > ?
+        ORDER BY changes.seq
+        ''', (state["seq"],)).fetchall()
+        for seq, operation, *texts in rows:
+            if operation != "insert":
+                state["maybe_gone"] = True
+                state["checked"].clear()
+            for column, text in zip(FUZZY_COLUMNS, texts):
+                index = state["columns"][column]
+                for word in words(text or ""):
+                    if word not in index.words:
+                        index.add(word)
+            state["seq"] = seq
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._databases.clear()
+
+
+def _latest_change(conn):
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'book_changes'").fetchone()
+    return row[0] if row else 0
+
+
+FUZZY_INDEXES = FuzzyIndexes()
@@ -0,0 +1,1350 @@
+"""SQLite data layer for the library manager.
+
+Nothing here imports Streamlit, so the same functions back the web app,
+the command-line tools and scripts.
+"""
+
+import os
+import sqlite3
+import re
+import threading
+import urllib.parse
+from contextlib import contextmanager
+from datetime import datetime
+
+from fuzzy_index import FUZZY_INDEXES, word_similarity, words
+from profiling import profiled
+from query_cache import QUERY_CACHE, cached_query
+
+DB_PATH = 'library.db'
+
+BOOK_COLUMNS = ["id", "title", "author", "publication_year", "genre", "read_status", "date_added", "row_version"]
+SORT_COLUMNS = ["title", "author", "publication_year", "genre"]
+# SQL for each column of the books view, for queries that join book_rows themselves.
+COLUMN_EXPRESSIONS = {
+    "id": "book_rows.id",
+    "title": "book_rows.title",
+    "author": "authors.name",
+    "publication_year": "book_rows.publication_year",
+    "genre": "genres.name",
+    "read_status": "book_rows.read_status",
+    "date_added": "book_rows.date_added",
+    "row_version": "book_rows.row_version",
+}
+PAGE_SIZE = 30
+SEARCH_COLUMNS = {"title": "title", "author": "author", "genre": "genre"}
+MIN_PUBLICATION_YEAR = 1000
+FUZZY_CANDIDATES = 200
+# Baked into the recent_books triggers; changing it needs a new migration.
+RECENT_BOOKS_KEPT = 12
+
+class LibraryConnection(sqlite3.Connection):
+    """A sqlite3 connection that remembers the database file it was opened on."""
+    
+    def __init__(self, path, *args, **kwargs):
+        super().__init__(path, *args, **kwargs)
+        self.path = path
+
+def connect(path=DB_PATH, read_only=False):
+    """Open a connection configured for many concurrent readers and one writer.
+
+    WAL lets readers proceed while a write is in progress, and with
+    synchronous=NORMAL a commit no longer waits on fsync of the database file.
+    
+    A ``read_only`` connection opens the file with mode=ro and query_only
+    set, so it can never take the write lock: with WAL its reads run on a
+    snapshot and neither wait for nor hold up writers. The database must
+    already exist and be migrated.
+    """
+    if read_only:
+        uri = "file:%s?mode=ro" % urllib.parse.quote(os.path.abspath(path))
+        conn = sqlite3.connect(uri, uri=True, timeout=30, check_same_thread=False, cached_statements=256,
+                               factory=LibraryConnection)
+        # Keep the plain path, which keys the query cache together with the writers.
+        conn.path = path
+        conn.execute("PRAGMA query_only = 1")
+    else:
+        conn = sqlite3.connect(path, timeout=30, check_same_thread=False, cached_statements=256, factory=LibraryConnection)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA mmap_size = 268435456")
+    return conn
+
+def init_db(path=DB_PATH):
+    conn = connect(path)
+    migrate(conn)
+    return conn
+
+def _create_books_table(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS books (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        author TEXT NOT NULL,
+        publication_year INTEGER,
+        genre TEXT,
+        read_status INTEGER,
+        date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    # Databases from before reading status was tracked lack the column.
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(books)")]
+    if "read_status" not in columns:
+        cursor.execute("ALTER TABLE books ADD COLUMN read_status INTEGER DEFAULT 0")
+
+def _create_search_index(cursor):
+    """Create the FTS5 index over books and backfill it from existing rows.
+
+    The index is an external-content table, so it stores only the tokens and
+    reads the text back from ``books``. Triggers keep it in sync on every write.
+    """
+    try:
+        cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+            title, author, genre,
+            content='books',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        ''')
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5: search_books falls back to LIKE.
+        return
+    
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, title, author, genre)
+        VALUES (new.id, new.title, new.author, new.genre);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, genre)
+        VALUES ('delete', old.id, old.title, old.author, old.genre);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS books_fts_update AFTER UPDATE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, genre)
+        VALUES ('delete', old.id, old.title, old.author, old.genre);
+        INSERT INTO books_fts(rowid, title, author, genre)
+        VALUES (new.id, new.title, new.author, new.genre);
+    END
+    ''')
+    cursor.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+
+def _create_books_indexes(cursor):
+    # An index on a column also orders by rowid, which serves the (column, id) seek in get_books_page.
+    for column in ["title", "author", "genre", "publication_year", "read_status", "date_added"]:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_books_{column} ON books ({column})")
+
+def _statistics_delta(row, sign, genre="genre", author="author"):
+    """SQL applying one books row (``new`` or ``old``) to the summary tables.
+
+    ``sign`` is "+" to count the row in and "-" to count it out; counting out
+    drops group rows that reach zero. ``genre`` and ``author`` name the
+    grouping columns, which are the same in the row and in the summary table.
+    """
+    is_read = f"(IFNULL({row}.read_status, 0) = 1)"
+    decade = f"(CAST({row}.publication_year AS INTEGER) / 10 * 10)"
+    statements = [
+        f"UPDATE library_stats SET total_books = total_books {sign} 1, read_books = read_books {sign} {is_read};",
+        f"""INSERT INTO genre_stats ({genre}, book_count, read_count)
+            SELECT {row}.{genre}, {sign}1, {sign}{is_read} WHERE {row}.{genre} IS NOT NULL
+            ON CONFLICT ({genre}) DO UPDATE SET
+                book_count = book_count + excluded.book_count,
+                read_count = read_count + excluded.read_count;""",
+        f"""INSERT INTO decade_stats (decade, book_count)
+            SELECT {decade}, {sign}1 WHERE {row}.publication_year IS NOT NULL
+            ON CONFLICT (decade) DO UPDATE SET book_count = book_count + excluded.book_count;""",
+        f"""INSERT INTO author_stats ({author}, book_count, read_count)
+            SELECT {row}.{author}, {sign}1, {sign}{is_read} WHERE {row}.{author} IS NOT NULL
+            ON CONFLICT ({author}) DO UPDATE SET
+                book_count = book_count + excluded.book_count,
+                read_count = read_count + excluded.read_count;""",
+    ]
+    if sign == "-":
+        statements += [
+            f"DELETE FROM genre_stats WHERE {genre} = {row}.{genre} AND book_count = 0;",
+            f"DELETE FROM decade_stats WHERE decade = {decade} AND book_count = 0;",
+            f"DELETE FROM author_stats WHERE {author} = {row}.{author} AND book_count = 0;",
+        ]
+    return "\n".join(statements)
+
+def _create_statistics_tables(cursor):
+    """Summary tables kept current by triggers, so statistics never scan books."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS library_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_books INTEGER NOT NULL,
+        read_books INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS genre_stats (
+        genre TEXT PRIMARY KEY,
+        book_count INTEGER NOT NULL,
+        read_count INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS decade_stats (
+        decade INTEGER PRIMARY KEY,
+        book_count INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS author_stats (
+        author TEXT PRIMARY KEY,
+        book_count INTEGER NOT NULL,
+        read_count INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_author_stats_book_count ON author_stats (book_count)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_author_stats_read_count ON author_stats (read_count)")
+    
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS books_stats_insert AFTER INSERT ON books BEGIN
+        {_statistics_delta("new", "+")}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS books_stats_delete AFTER DELETE ON books BEGIN
+        {_statistics_delta("old", "-")}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS books_stats_update
+    AFTER UPDATE OF author, genre, publication_year, read_status ON books BEGIN
+        {_statistics_delta("old", "-")}
+        {_statistics_delta("new", "+")}
+    END
+    ''')
+    
+    # Backfill from the existing rows; re-running simply recomputes them.
+    cursor.execute('''
+    INSERT OR REPLACE INTO library_stats (id, total_books, read_books)
+    SELECT 1, COUNT(*), IFNULL(SUM(IFNULL(read_status, 0) = 1), 0) FROM books
+    ''')
+    cursor.execute("DELETE FROM genre_stats")
+    cursor.execute('''
+    INSERT INTO genre_stats (genre, book_count, read_count)
+    SELECT genre, COUNT(*), SUM(IFNULL(read_status, 0) = 1) FROM books
+    WHERE genre IS NOT NULL GROUP BY genre
+    ''')
+    cursor.execute("DELETE FROM decade_stats")
+    cursor.execute('''
+    INSERT INTO decade_stats (decade, book_count)
+    SELECT CAST(publication_year AS INTEGER) / 10 * 10 AS decade, COUNT(*) FROM books
+    WHERE publication_year IS NOT NULL GROUP BY decade
+    ''')
+    cursor.execute("DELETE FROM author_stats")
+    cursor.execute('''
+    INSERT INTO author_stats (author, book_count, read_count)
+    SELECT author, COUNT(*), SUM(IFNULL(read_status, 0) = 1) FROM books
+    WHERE author IS NOT NULL GROUP BY author
+    ''')
+
+def _create_import_checkpoints(cursor):
+    # One row per in-progress bulk import; written in the same transaction as each batch.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS import_checkpoints (
+        source TEXT PRIMARY KEY,
+        records_done INTEGER NOT NULL,
+        imported INTEGER NOT NULL,
+        rejected INTEGER NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+def _add_row_version(cursor):
+    """Count changes per row so cached renderings can tell when a book was edited."""
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(books)")]
+    if "row_version" not in columns:
+        cursor.execute("ALTER TABLE books ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0")
+    
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS books_row_version
+    AFTER UPDATE OF title, author, publication_year, genre, read_status ON books BEGIN
+        UPDATE books SET row_version = old.row_version + 1 WHERE id = new.id;
+    END
+    ''')
+    
+    # Only reindex when indexed text changes, not on every row_version bump.
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'books_fts_update'")
+    if cursor.fetchone():
+        cursor.execute("DROP TRIGGER books_fts_update")
+        cursor.execute('''
+        CREATE TRIGGER books_fts_update AFTER UPDATE OF title, author, genre ON books BEGIN
+            INSERT INTO books_fts(books_fts, rowid, title, author, genre)
+            VALUES ('delete', old.id, old.title, old.author, old.genre);
+            INSERT INTO books_fts(rowid, title, author, genre)
+            VALUES (new.id, new.title, new.author, new.genre);
+        END
+        ''')
+
+def _create_search_vocabulary(cursor):
+    """Expose the distinct words of each indexed column, for typo-tolerant search."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'books_fts'")
+    if cursor.fetchone():
+        cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS books_fts_terms USING fts5vocab(books_fts, 'col')")
+
+def _create_recent_books(cursor):
+    """Keep the ids of the newest books in a small table, maintained by triggers.
+
+    The home page reads it together with library_stats in one query instead
+    of sorting books. Deleting one of the kept books refills the table from
+    the date_added index.
+    """
+    newest = f"ORDER BY date_added DESC, id DESC LIMIT {RECENT_BOOKS_KEPT}"
+    refill = f"INSERT OR IGNORE INTO recent_books (id, date_added) SELECT id, date_added FROM books {newest};"
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS recent_books (
+        id INTEGER PRIMARY KEY,
+        date_added TIMESTAMP
+    )
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS books_recent_insert AFTER INSERT ON books BEGIN
+        INSERT INTO recent_books (id, date_added) VALUES (new.id, new.date_added);
+        DELETE FROM recent_books WHERE id IN (
+            SELECT id FROM recent_books ORDER BY date_added DESC, id DESC LIMIT -1 OFFSET {RECENT_BOOKS_KEPT}
+        );
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS books_recent_delete AFTER DELETE ON books
+    WHEN old.id IN (SELECT id FROM recent_books) BEGIN
+        DELETE FROM recent_books WHERE id = old.id;
+        {refill}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS books_recent_update AFTER UPDATE OF date_added ON books BEGIN
+        DELETE FROM recent_books;
+        {refill}
+    END
+    ''')
+    cursor.execute("DELETE FROM recent_books")
+    cursor.execute(refill)
+
+def _normalize_authors_and_genres(cursor):
+    """Store each author and genre name once and refer to it by integer id.
+
+    Rows move to ``book_rows``, keeping their ids, with ``author_id`` and
+    ``genre_id`` in place of the text columns. A ``books`` view joins the
+    names back in, so reads and the FTS index see the same columns as
+    before. Writers go to ``book_rows`` directly (see insert_books). The
+    summary tables are re-keyed by id and every trigger moves to
+    ``book_rows``.
+    """
+    cursor.execute("CREATE TABLE IF NOT EXISTS authors (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    cursor.execute("CREATE TABLE IF NOT EXISTS genres (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    cursor.execute("SELECT type FROM sqlite_master WHERE name = 'books'")
+    if cursor.fetchone()[0] == "table":
+        cursor.execute("INSERT OR IGNORE INTO authors (name) SELECT DISTINCT author FROM books WHERE author IS NOT NULL")
+        cursor.execute("INSERT OR IGNORE INTO genres (name) SELECT DISTINCT genre FROM books WHERE genre IS NOT NULL")
+        cursor.execute('''
+        CREATE TABLE book_rows (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            author_id INTEGER NOT NULL REFERENCES authors (id),
+            publication_year INTEGER,
+            genre_id INTEGER REFERENCES genres (id),
+            read_status INTEGER DEFAULT 0,
+            date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            row_version INTEGER NOT NULL DEFAULT 0
+        )
+        ''')
+        cursor.execute('''
+        INSERT INTO book_rows (id, title, author_id, publication_year, genre_id, read_status, date_added, row_version)
+        SELECT books.id, books.title, authors.id, books.publication_year, genres.id,
+               books.read_status, books.date_added, books.row_version
+        FROM books
+        JOIN authors ON authors.name = books.author
+        LEFT JOIN genres ON genres.name = books.genre
+        ORDER BY books.id
+        ''')
+        # Ids of deleted books stay retired.
+        cursor.execute('''
+        UPDATE sqlite_sequence SET seq = MAX(seq, (SELECT seq FROM sqlite_sequence WHERE name = 'books'))
+        WHERE name = 'book_rows'
+        ''')
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'books'")
+        # Dropping the table also drops its indexes and triggers.
+        cursor.execute("DROP TABLE books")
+    
+    cursor.execute('''
+    CREATE VIEW IF NOT EXISTS books AS
+    SELECT book_rows.id, book_rows.title, authors.name AS author, book_rows.publication_year,
+           genres.name AS genre, book_rows.read_status, book_rows.date_added, book_rows.row_version
+    FROM book_rows
+    JOIN authors ON authors.id = book_rows.author_id
+    LEFT JOIN genres ON genres.id = book_rows.genre_id
+    ''')
+    for column in ["title", "author_id", "genre_id", "publication_year", "read_status", "date_added"]:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_book_rows_{column} ON book_rows ({column})")
+    
+    # Summary tables keyed by id instead of name.
+    cursor.execute("DROP TABLE IF EXISTS genre_stats")
+    cursor.execute("DROP TABLE IF EXISTS author_stats")
+    cursor.execute('''
+    CREATE TABLE genre_stats (
+        genre_id INTEGER PRIMARY KEY,
+        book_count INTEGER NOT NULL,
+        read_count INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE author_stats (
+        author_id INTEGER PRIMARY KEY,
+        book_count INTEGER NOT NULL,
+        read_count INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_author_stats_book_count ON author_stats (book_count)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_author_stats_read_count ON author_stats (read_count)")
+    cursor.execute('''
+    INSERT INTO genre_stats (genre_id, book_count, read_count)
+    SELECT genre_id, COUNT(*), SUM(IFNULL(read_status, 0) = 1) FROM book_rows
+    WHERE genre_id IS NOT NULL GROUP BY genre_id
+    ''')
+    cursor.execute('''
+    INSERT INTO author_stats (author_id, book_count, read_count)
+    SELECT author_id, COUNT(*), SUM(IFNULL(read_status, 0) = 1) FROM book_rows GROUP BY author_id
+    ''')
+    
+    def names(row):
+        return (f"(SELECT name FROM authors WHERE id = {row}.author_id)",
+                f"(SELECT name FROM genres WHERE id = {row}.genre_id)")
+    
+    new_author, new_genre = names("new")
+    old_author, old_genre = names("old")
+    index_new = f"INSERT INTO books_fts(rowid, title, author, genre) VALUES (new.id, new.title, {new_author}, {new_genre});"
+    index_old = (f"INSERT INTO books_fts(books_fts, rowid, title, author, genre) "
+                 f"VALUES ('delete', old.id, old.title, {old_author}, {old_genre});")
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'books_fts'")
+    if cursor.fetchone():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS book_rows_fts_insert AFTER INSERT ON book_rows BEGIN {index_new} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS book_rows_fts_delete AFTER DELETE ON book_rows BEGIN {index_old} END")
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS book_rows_fts_update AFTER UPDATE OF title, author_id, genre_id ON book_rows BEGIN
+            {index_old}
+            {index_new}
+        END
+        ''')
+    
+    keys = {"genre": "genre_id", "author": "author_id"}
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS book_rows_stats_insert AFTER INSERT ON book_rows BEGIN
+        {_statistics_delta("new", "+", **keys)}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS book_rows_stats_delete AFTER DELETE ON book_rows BEGIN
+        {_statistics_delta("old", "-", **keys)}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS book_rows_stats_update
+    AFTER UPDATE OF author_id, genre_id, publication_year, read_status ON book_rows BEGIN
+        {_statistics_delta("old", "-", **keys)}
+        {_statistics_delta("new", "+", **keys)}
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS book_rows_row_version
+    AFTER UPDATE OF title, author_id, publication_year, genre_id, read_status ON book_rows BEGIN
+        UPDATE book_rows SET row_version = old.row_version + 1 WHERE id = new.id;
+    END
+    ''')
+    
+    newest = f"ORDER BY date_added DESC, id DESC LIMIT {RECENT_BOOKS_KEPT}"
+    refill = f"INSERT OR IGNORE INTO recent_books (id, date_added) SELECT id, date_added FROM book_rows {newest};"
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS book_rows_recent_insert AFTER INSERT ON book_rows BEGIN
+        INSERT INTO recent_books (id, date_added) VALUES (new.id, new.date_added);
+        DELETE FROM recent_books WHERE id IN (
+            SELECT id FROM recent_books ORDER BY date_added DESC, id DESC LIMIT -1 OFFSET {RECENT_BOOKS_KEPT}
+        );
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS book_rows_recent_delete AFTER DELETE ON book_rows
+    WHEN old.id IN (SELECT id FROM recent_books) BEGIN
+        DELETE FROM recent_books WHERE id = old.id;
+        {refill}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS book_rows_recent_update AFTER UPDATE OF date_added ON book_rows BEGIN
+        DELETE FROM recent_books;
+        {refill}
+    END
+    ''')
+
+def _analytics_delta(row, sign):
+    """SQL applying one book_rows row to the analytics tables, like _statistics_delta."""
+    is_read = f"(IFNULL({row}.read_status, 0) = 1)"
+    day = f"date({row}.date_added)"
+    statements = [
+        f"""INSERT INTO added_stats (day, book_count, read_count)
+            SELECT {day}, {sign}1, {sign}{is_read} WHERE {day} IS NOT NULL
+            ON CONFLICT (day) DO UPDATE SET
+                book_count = book_count + excluded.book_count,
+                read_count = read_count + excluded.read_count;""",
+        f"""INSERT INTO year_stats (year, book_count, read_count)
+            SELECT CAST({row}.publication_year AS INTEGER), {sign}1, {sign}{is_read}
+            WHERE {row}.publication_year IS NOT NULL
+            ON CONFLICT (year) DO UPDATE SET
+                book_count = book_count + excluded.book_count,
+                read_count = read_count + excluded.read_count;""",
+        f"""INSERT INTO author_genre_stats (author_id, genre_id, book_count, read_count)
+            SELECT {row}.author_id, {row}.genre_id, {sign}1, {sign}{is_read} WHERE {row}.genre_id IS NOT NULL
+            ON CONFLICT (author_id, genre_id) DO UPDATE SET
+                book_count = book_count + excluded.book_count,
+                read_count = read_count + excluded.read_count;""",
+    ]
+    if sign == "-":
+        statements += [
+            f"DELETE FROM added_stats WHERE day = {day} AND book_count = 0;",
+            f"DELETE FROM year_stats WHERE year = CAST({row}.publication_year AS INTEGER) AND book_count = 0;",
+            f"""DELETE FROM author_genre_stats
+                WHERE author_id = {row}.author_id AND genre_id = {row}.genre_id AND book_count = 0;""",
+        ]
+    return "\n".join(statements)
+
+def _create_analytics_tables(cursor):
+    """Finer summary tables behind analytics.py, kept current by triggers like the others.
+
+    They count books, and how many of them are read, per day added, per
+    publication year and per (author, genre) pair.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS added_stats (
+        day TEXT PRIMARY KEY,
+        book_count INTEGER NOT NULL,
+        read_count INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS year_stats (
+        year INTEGER PRIMARY KEY,
+        book_count INTEGER NOT NULL,
+        read_count INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS author_genre_stats (
+        author_id INTEGER NOT NULL,
+        genre_id INTEGER NOT NULL,
+        book_count INTEGER NOT NULL,
+        read_count INTEGER NOT NULL,
+        PRIMARY KEY (author_id, genre_id)
+    ) WITHOUT ROWID
+    ''')
+    
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS book_rows_analytics_insert AFTER INSERT ON book_rows BEGIN
+        {_analytics_delta("new", "+")}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS book_rows_analytics_delete AFTER DELETE ON book_rows BEGIN
+        {_analytics_delta("old", "-")}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS book_rows_analytics_update
+    AFTER UPDATE OF author_id, genre_id, publication_year, read_status, date_added ON book_rows BEGIN
+        {_analytics_delta("old", "-")}
+        {_analytics_delta("new", "+")}
+    END
+    ''')
+    
+    # Backfill from the existing rows; re-running simply recomputes them.
+    cursor.execute("DELETE FROM added_stats")
+    cursor.execute('''
+    INSERT INTO added_stats (day, book_count, read_count)
+    SELECT date(date_added) AS day, COUNT(*), SUM(IFNULL(read_status, 0) = 1) FROM book_rows
+    WHERE day IS NOT NULL GROUP BY day
+    ''')
+    cursor.execute("DELETE FROM year_stats")
+    cursor.execute('''
+    INSERT INTO year_stats (year, book_count, read_count)
+    SELECT CAST(publication_year AS INTEGER) AS year, COUNT(*), SUM(IFNULL(read_status, 0) = 1) FROM book_rows
+    WHERE publication_year IS NOT NULL GROUP BY year
+    ''')
+    cursor.execute("DELETE FROM author_genre_stats")
+    cursor.execute('''
+    INSERT INTO author_genre_stats (author_id, genre_id, book_count, read_count)
+    SELECT author_id, genre_id, COUNT(*), SUM(IFNULL(read_status, 0) = 1) FROM book_rows
+    WHERE genre_id IS NOT NULL GROUP BY author_id, genre_id
+    ''')
+
+def _add_dedup_keys(cursor):
+    """Store each book's book_key so exact duplicates are found with one index lookup.
+
+    insert_books writes the key, since normalizing it needs Python; the
+    backfill registers book_key as an SQL function for the duration of the
+    migration. ``duplicate_candidates`` holds the groups last found by
+    dedup.py and ``distinct_books`` the pairs someone marked as different
+    books.
+    """
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(book_rows)")]
+    if "dedup_key" not in columns:
+        cursor.execute("ALTER TABLE book_rows ADD COLUMN dedup_key TEXT")
+    cursor.connection.create_function("book_key", 3, book_key, deterministic=True)
+    cursor.execute('''
+    UPDATE book_rows SET dedup_key = book_key(title, (SELECT name FROM authors WHERE id = author_id), publication_year)
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_book_rows_dedup_key ON book_rows (dedup_key)")
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS duplicate_candidates (
+        book_id INTEGER PRIMARY KEY,
+        group_id INTEGER NOT NULL,
+        similarity REAL NOT NULL
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_duplicate_candidates_group_id ON duplicate_candidates (group_id)")
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS distinct_books (
+        first_id INTEGER NOT NULL,
+        second_id INTEGER NOT NULL,
+        PRIMARY KEY (first_id, second_id)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS book_rows_duplicates_delete AFTER DELETE ON book_rows BEGIN
+        DELETE FROM duplicate_candidates WHERE book_id = old.id;
+    END
+    ''')
+
+def _create_change_journal(cursor):
+    """Journal every change to book_rows in the same transaction as the change.
+
+    Each insert, delete and edit of a book appends a row to
+    ``book_changes`` whose ``seq`` only ever grows (AUTOINCREMENT never
+    reuses a number), so consumers can sync with change_log.changes_since
+    instead of rereading the table. Changes made before this migration are
+    not journaled. ``change_journal_state`` holds the last seq removed by
+    compaction; a consumer that synced before it has to read everything
+    again.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS book_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        book_id INTEGER NOT NULL,
+        operation TEXT NOT NULL,
+        changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS change_journal_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        compacted_through INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO change_journal_state (id, compacted_through) VALUES (1, 0)")
+    
+    for operation, event, row in [("insert", "INSERT", "new"), ("delete", "DELETE", "old"),
+                                  ("update", "UPDATE OF title, author_id, publication_year, genre_id, read_status, date_added", "new")]:
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS book_rows_journal_{operation} AFTER {event} ON book_rows BEGIN
+            INSERT INTO book_changes (book_id, operation) VALUES ({row}.id, '{operation}');
+        END
+        ''')
+
+# Append only: a migration's position in this list is its schema version.
+MIGRATIONS = [
+    _create_books_table,
+    _create_search_index,
+    _create_books_indexes,
+    _create_statistics_tables,
+    _create_import_checkpoints,
+    _add_row_version,
+    _create_search_vocabulary,
+    _create_recent_books,
+    _normalize_authors_and_genres,
+    _create_analytics_tables,
+    _add_dedup_keys,
+    _create_change_journal,
+]
+
+def migrate(conn):
+    """Bring the schema up to date, recording progress in PRAGMA user_version.
+
+    An up-to-date database costs a single PRAGMA read. Each pending migration
+    runs in its own transaction together with the version bump, so an
+    interrupted upgrade resumes where it stopped. Migrations only use
+    IF NOT EXISTS style statements and are safe to re-run. If the upgrade
+    left much of the file unused, as rewriting the books table does, the
+    file is vacuumed afterwards.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= len(MIGRATIONS):
+        return
+    
+    cursor = conn.cursor()
+    while True:
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-read under the write lock in case another process migrated first.
+            version = cursor.execute("PRAGMA user_version").fetchone()[0]
+            if version >= len(MIGRATIONS):
+                conn.rollback()
+                break
+            MIGRATIONS[version](cursor)
+            cursor.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if free_pages * 4 > conn.execute("PRAGMA page_count").fetchone()[0]:
+        try:
+            conn.execute("VACUUM")
+        except sqlite3.OperationalError:
+            # Another connection is busy; the space is still reused by later writes.
+            pass
+
+@profiled
+def get_column_names(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("PRAGMA table_info(books)")
+        columns = cursor.fetchall()
+        return [col[1] for col in columns]
+    except sqlite3.Error:
+        return ["ID", "Title", "Author", "Publication Year", "Genre", "Read Status", "Date Added"]
+
+class ConnectionManager:
+    """Hands out connections to a single database file.
+
+    Streamlit runs each script rerun on its own thread. A thread keeps its
+    connection from connection() until it calls release() at the end of
+    the run, and connections are recycled instead of reopened, so the
+    schema is migrated and the column list read only once per process.
+    Connections of threads that finish without releasing are reclaimed.
+    Code running on long-lived threads, such as a server's worker pool,
+    uses lease() instead, which gives the connection back when the block
+    ends.
+    
+    At most ``max_idle`` connections are kept for reuse; the rest are closed
+    when given back, so a burst of concurrent leases does not leave one open
+    connection per worker thread behind.
+    
+    With ``read_only`` set it hands out read-only connections instead (see
+    connect) and does not migrate; open a writing manager first.
+    """
+    
+    def __init__(self, path=DB_PATH, read_only=False, max_idle=4):
+        self.path = path
+        self.read_only = read_only
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        conn = connect(path, read_only=True) if read_only else init_db(path)
+        self.column_names = get_column_names(conn)
+        self._idle = [conn]
+        self._in_use = {}
+        self._leased = 0
+        self._closed = False
+    
+    def connection(self):
+        thread = threading.current_thread()
+        with self._lock:
+            entry = self._in_use.get(thread.ident)
+            if entry is not None and entry[0] is thread:
+                return entry[1]
+            
+            self._reclaim_finished()
+            conn = self._take()
+            self._in_use[thread.ident] = (thread, conn)
+            return conn
+    
+    def release(self):
+        """Give back the connection the current thread got from connection(), if any."""
+        thread = threading.current_thread()
+        with self._lock:
+            entry = self._in_use.get(thread.ident)
+            if entry is not None and entry[0] is thread:
+                del self._in_use[thread.ident]
+                self._give_back(entry[1])
+    
+    @contextmanager
+    def lease(self):
+        """A connection of its own for the length of the block."""
+        with self._lock:
+            conn = self._take()
+            self._leased += 1
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                self._leased -= 1
+                self._give_back(conn)
+    
+    def in_use(self):
+        """Whether a connection is leased or held by a live thread that has not released it."""
+        with self._lock:
+            return self._leased > 0 or any(thread.is_alive() for thread, _ in self._in_use.values())
+    
+    def _take(self):
+        return self._idle.pop() if self._idle else connect(self.path, self.read_only)
+    
+    def _give_back(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        # A connection outliving close() is closed instead of pooled.
+        if self._closed or len(self._idle) >= self.max_idle:
+            conn.close()
+        else:
+            self._idle.append(conn)
+    
+    def _reclaim_finished(self):
+        for ident, (thread, conn) in list(self._in_use.items()):
+            if not thread.is_alive():
+                del self._in_use[ident]
+                self._give_back(conn)
+    
+    def close(self):
+        with self._lock:
+            for conn in self._idle + [conn for _, conn in self._in_use.values()]:
+                conn.close()
+            self._idle = []
+            self._in_use = {}
+            self._closed = True
+
+def validate_book(title, author, publication_year, genre):
+    """Return why a book would be rejected, or None if it can be added.
+
+    These are the Add Book form's rules; bulk imports apply the same ones.
+    """
+    if not (title and author and genre):
+        return "Please provide all fields."
+    current_year = datetime.now().year
+    if publication_year is None or not MIN_PUBLICATION_YEAR <= publication_year <= current_year:
+        return f"Publication year must be between {MIN_PUBLICATION_YEAR} and {current_year}."
+    return None
+
+class DuplicateBookError(ValueError):
+    """Raised for a book that is already in the library; ``book_id`` is the copy already stored."""
+    
+    def __init__(self, book_id):
+        super().__init__(f"This book is already in the library (book #{book_id}).")
+        self.book_id = book_id
+
+def book_key(title, author, publication_year):
+    """The key two books must share to count as exact duplicates.
+
+    Title and author are casefolded and reduced to their words, so case,
+    accents, punctuation and spacing do not matter: "The Hobbit" by
+    "J.R.R. Tolkien" and "the hobbit" by "J. R. R. Tolkien" share a key.
+    """
+    year = "" if publication_year is None else str(int(publication_year))
+    return "|".join([" ".join(words(title.casefold())), " ".join(words(author.casefold())), year])
+
+def find_duplicate(conn, title, author, publication_year):
+    """The id of a stored book with the same book_key, or None."""
+    row = conn.execute("SELECT id FROM book_rows WHERE dedup_key = ? LIMIT 1",
+                       (book_key(title, author, publication_year),)).fetchone()
+    return row[0] if row else None
+
+def intern_names(cursor, table, names):
+    """Make sure ``authors`` or ``genres`` has a row for each of ``names``."""
+    cursor.executemany(f"INSERT INTO {table} (name) VALUES (?) ON CONFLICT (name) DO NOTHING",
+                       [(name,) for name in set(names) if name is not None])
+
+def insert_books(cursor, books):
+    """Insert (title, author, publication_year, genre, read_status) tuples into book_rows.
+
+    Author and genre names are interned first and stored by id, and each
+    book's book_key is stored with it. Duplicates are not checked here; see
+    find_duplicate. Returns the id of the last book inserted.
+    """
+    books = list(books)
+    intern_names(cursor, "authors", [book[1] for book in books])
+    intern_names(cursor, "genres", [book[3] for book in books])
+    cursor.executemany('''
+    INSERT INTO book_rows (title, author_id, publication_year, genre_id, read_status, dedup_key)
+    VALUES (?, (SELECT id FROM authors WHERE name = ?), ?, (SELECT id FROM genres WHERE name = ?), ?, ?)
+    ''', [(title, author, publication_year, genre, 1 if read_status else 0, book_key(title, author, publication_year))
+          for title, author, publication_year, genre, read_status in books])
+    # cursor.lastrowid is not set by executemany.
+    return cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+
+@profiled
+def add_book(conn, title, author, publication_year, genre, read_status, allow_duplicate=False):
+    """Add one book. Returns False if it failed or, unless ``allow_duplicate``, if the book is already stored."""
+    cursor = conn.cursor()
+    try:
+        if not allow_duplicate and find_duplicate(cursor, title, author, publication_year) is not None:
+            return False
+        insert_books(cursor, [(title, author, publication_year, genre, read_status)])
+        conn.commit()
+        QUERY_CACHE.invalidate(conn)
+        return True
+    except sqlite3.Error:
+        return False
+
+@profiled
+def add_books(conn, books, commit=True):
+    """Insert (title, author, publication_year, genre, read_status) tuples in one statement.
+
+    Pass ``commit=False`` to add more work to the same transaction before committing.
+    Returns the number of books inserted, or None if the insert failed.
+    """
+    rows = list(books)
+    cursor = conn.cursor()
+    try:
+        insert_books(cursor, rows)
+        if commit:
+            conn.commit()
+        QUERY_CACHE.invalidate(conn)
+        return len(rows)
+    except sqlite3.Error:
+        conn.rollback()
+        return None
+
+def merge_into(cursor, keep_id, duplicate_ids):
+    """Fold ``duplicate_ids`` into the book ``keep_id`` and delete them.
+
+    The kept book counts as read if any copy was, takes the earliest date
+    added, and takes a genre from the copies if it has none. Returns the
+    number of copies deleted.
+    """
+    duplicate_ids = [book_id for book_id in duplicate_ids if book_id != keep_id]
+    if not duplicate_ids:
+        return 0
+    placeholders = ", ".join("?" * len(duplicate_ids))
+    cursor.execute(f'''
+    UPDATE book_rows SET
+        read_status = MAX(IFNULL(read_status, 0), (SELECT MAX(IFNULL(read_status, 0)) FROM book_rows WHERE id IN ({placeholders}))),
+        date_added = MIN(date_added, IFNULL((SELECT MIN(date_added) FROM book_rows WHERE id IN ({placeholders})), date_added)),
+        genre_id = IFNULL(genre_id, (SELECT genre_id FROM book_rows WHERE id IN ({placeholders}) AND genre_id IS NOT NULL
+                                    ORDER BY id LIMIT 1))
+    WHERE id = ?
+    ''', duplicate_ids * 3 + [keep_id])
+    if cursor.rowcount == 0:
+        raise ValueError(f"No book #{keep_id} to merge into.")
+    cursor.execute(f"DELETE FROM book_rows WHERE id IN ({placeholders})", duplicate_ids)
+    return cursor.rowcount
+
+def interrupted(error):
+    """Whether a query was cancelled by conn.interrupt() or a progress handler.
+
+    Read functions re-raise these instead of returning an empty result, so
+    the cancelled call is not mistaken for (or cached as) "no matches".
+    """
+    return getattr(error, "sqlite_errorcode", None) == sqlite3.SQLITE_INTERRUPT
+
+def build_fts_query(search_term, column):
+    """Turn free text into an FTS5 MATCH expression scoped to one column.
+
+    Text wrapped in double quotes is matched as an exact phrase; otherwise
+    every word must appear, and the last one may be a prefix so results
+    narrow while the user is still typing.
+    """
+    term = search_term.strip()
+    if len(term) > 1 and term.startswith('"') and term.endswith('"'):
+        words = re.findall(r"\w+", term[1:-1])
+        if not words:
+            return None
+        return '%s : "%s"' % (column, " ".join(words))
+    
+    words = re.findall(r"\w+", term)
+    if not words:
+        return None
+    tokens = ['"%s"' % word for word in words[:-1]]
+    tokens.append('"%s"*' % words[-1])
+    return "%s : (%s)" % (column, " AND ".join(tokens))
+
+def build_fuzzy_fts_queries(conn, search_term, column, alternatives=5):
+    """FTS5 MATCH expressions for a possibly misspelled ``search_term``, strictest first.
+
+    Each word is replaced by the indexed words closest to it: the first
+    expression uses only the closest word for each, later ones allow more
+    alternatives. The last word also matches as a prefix, for
+    search-as-you-type. Returns [] when there is nothing to search for or no
+    vocabulary to search in.
+    """
+    query_words = words(search_term)
+    closest = FUZZY_INDEXES.closest(conn, column, query_words, alternatives) if query_words else None
+    if not closest:
+        return []
+    
+    queries = []
+    for width in sorted({1, alternatives}):
+        groups = []
+        for position, (word, matches) in enumerate(zip(query_words, closest)):
+            tokens = ['"%s"' % match for match, _ in matches[:width]]
+            if position == len(query_words) - 1:
+                tokens.append('"%s"*' % word)
+            if tokens:
+                groups.append("(%s)" % " OR ".join(tokens))
+        query = "%s : (%s)" % (column, " AND ".join(groups))
+        if query not in queries:
+            queries.append(query)
+    return queries
+
+def _fuzzy_search(cursor, search_term, column, limit):
+    wanted = max(limit or 0, FUZZY_CANDIDATES)
+    candidates = {}
+    for match in build_fuzzy_fts_queries(cursor.connection, search_term, column):
+        # No ORDER BY: ranking every row that contains a common word is what
+        # makes a search slow, and the candidates are re-ranked below anyway.
+        try:
+            cursor.execute('''
+            SELECT books.* FROM books_fts
+            JOIN books ON books.id = books_fts.rowid
+            WHERE books_fts MATCH ?
+            LIMIT ?
+            ''', (match, wanted))
+        except sqlite3.Error as error:
+            if interrupted(error):
+                raise
+            return []
+        for row in cursor.fetchall():
+            candidates.setdefault(row[0], row)
+        if len(candidates) >= wanted:
+            break
+    
+    position = BOOK_COLUMNS.index(column)
+    ranked = sorted(candidates.values(), key=lambda row: -word_similarity(search_term, row[position]))
+    return ranked[:limit]
+
+@profiled
+@cached_query
+def search_books(conn, search_term, search_by, limit=None, fuzzy=False):
+    """Books whose ``search_by`` column matches ``search_term``, best matches first.
+
+    With ``fuzzy`` set, misspelled words still match the words closest to
+    them in the index.
+    """
+    column = SEARCH_COLUMNS.get(search_by.lower())
+    if column is None:
+        return []
+    
+    cursor = conn.cursor()
+    if fuzzy:
+        return _fuzzy_search(cursor, search_term, column, limit)
+    
+    match = build_fts_query(search_term, column)
+    if match is not None:
+        try:
+            cursor.execute('''
+            SELECT books.* FROM books_fts
+            JOIN books ON books.id = books_fts.rowid
+            WHERE books_fts MATCH ?
+            ORDER BY bm25(books_fts)
+            LIMIT ?
+            ''', (match, -1 if limit is None else limit))
+            return cursor.fetchall()
+        except sqlite3.OperationalError as error:
+            if interrupted(error):
+                raise
+    
+    try:
+        query = f"SELECT * FROM books WHERE {column} LIKE ? LIMIT ?"
+        cursor.execute(query, (f'%{search_term}%', -1 if limit is None else limit))
+        return cursor.fetchall()
+    except sqlite3.Error as error:
+        if interrupted(error):
+            raise
+        return []
+
+@profiled
+@cached_query
+def get_all_books(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT * FROM books")
+        return cursor.fetchall()
+    except sqlite3.Error:
+        return []
+
+@profiled
+@cached_query
+def get_books_by_id(conn, book_ids):
+    """The books with the given ids, in the order asked for; unknown ids are left out."""
+    cursor = conn.cursor()
+    found = {}
+    book_ids = list(book_ids)
+    try:
+        # Stay well below SQLite's limit on bound parameters.
+        for start in range(0, len(book_ids), 500):
+            chunk = book_ids[start:start + 500]
+            cursor.execute("SELECT %s FROM books WHERE id IN (%s)" % (", ".join(BOOK_COLUMNS), ", ".join("?" * len(chunk))),
+                           chunk)
+            found.update((row[0], row) for row in cursor.fetchall())
+    except sqlite3.Error:
+        return []
+    return [found[book_id] for book_id in book_ids if book_id in found]
+
+_NAME_JOINS = ("JOIN authors ON authors.id = book_rows.author_id "
+               "LEFT JOIN genres ON genres.id = book_rows.genre_id")
+
+def _genre_filter_clause(genres, sort_by, scan_in_order):
+    if not genres:
+        return "", []
+    names = ", ".join("?" * len(genres))
+    if sort_by == "genre":
+        return f"genres.name IN ({names})", list(genres)
+    # The unary + keeps SQLite off the genre_id index, so it walks the sort index instead.
+    column = "+book_rows.genre_id" if scan_in_order else "book_rows.genre_id"
+    return f"{column} IN (SELECT id FROM genres WHERE name IN ({names}))", list(genres)
+
+@profiled
+@cached_query
+def get_genres(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT name FROM genres JOIN genre_stats ON genre_stats.genre_id = genres.id ORDER BY name")
+        return [row[0] for row in cursor.fetchall()]
+    except sqlite3.Error:
+        return []
+
+@profiled
+@cached_query
+def count_books(conn, genres=None):
+    """Number of books, in the given genres if any; read from the summary tables."""
+    cursor = conn.cursor()
+    try:
+        if genres:
+            cursor.execute('''
+            SELECT IFNULL(SUM(book_count), 0) FROM genre_stats
+            JOIN genres ON genres.id = genre_stats.genre_id
+            WHERE genres.name IN (%s)
+            ''' % ", ".join("?" * len(genres)), list(genres))
+        else:
+            cursor.execute("SELECT IFNULL(MAX(total_books), 0) FROM library_stats WHERE id = 1")
+        return cursor.fetchone()[0]
+    except sqlite3.Error:
+        return 0
+
+def _books_query(sort_by, genres, after=None, columns=BOOK_COLUMNS, scan_in_order=True):
+    """The statements listing books ordered by (sort_by, id), as (query, params) to run in turn.
+
+    Sorting by author or genre walks the name index and, for each name, its
+    books through the integer key index, so no sort over all books is
+    needed. Books without a genre sort first and are listed by a statement
+    of their own.
+
+    With a genre filter, ``scan_in_order`` walks the sort order and skips
+    books of other genres; otherwise the books of the chosen genres are
+    read through the genre_id index and sorted, which is cheaper when they
+    are few.
+    """
+    if sort_by not in SORT_COLUMNS:
+        sort_by = SORT_COLUMNS[0]
+    key = COLUMN_EXPRESSIONS[sort_by]
+    select = "SELECT %s " % ", ".join(COLUMN_EXPRESSIONS[column] for column in columns)
+    
+    clause, params = _genre_filter_clause(genres, sort_by, scan_in_order)
+    conditions = [clause] if clause else []
+    statements = []
+    if sort_by == "genre":
+        source = ("FROM genres CROSS JOIN book_rows ON book_rows.genre_id = genres.id "
+                  "JOIN authors ON authors.id = book_rows.author_id")
+        if not genres and (after is None or after[0] is None):
+            query = select + "FROM book_rows " + _NAME_JOINS + " WHERE book_rows.genre_id IS NULL"
+            seek = []
+            if after is not None:
+                query += " AND book_rows.id > ?"
+                seek.append(after[1])
+            statements.append((query + " ORDER BY book_rows.id", seek))
+    elif sort_by == "author" and scan_in_order:
+        source = ("FROM authors CROSS JOIN book_rows ON book_rows.author_id = authors.id "
+                  "LEFT JOIN genres ON genres.id = book_rows.genre_id")
+    else:
+        source = "FROM book_rows " + _NAME_JOINS
+    
+    if after is not None:
+        after_value, after_id = after
+        if after_value is None:
+            # NULLs sort first, so the rest of the NULL run and every non-NULL value follow.
+            if sort_by != "genre":
+                conditions.append(f"(({key} IS NULL AND book_rows.id > ?) OR {key} IS NOT NULL)")
+                params.append(after_id)
+        else:
+            conditions.append(f"({key}, book_rows.id) > (?, ?)")
+            params.extend([after_value, after_id])
+    
+    query = select + source
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {key}, book_rows.id"
+    statements.append((query, params))
+    return statements
+
+@profiled
+@cached_query
+def get_books_page(conn, sort_by="title", genres=None, after=None, limit=PAGE_SIZE):
+    """Return one page of books ordered by (sort_by, id).
+
+    ``after`` is the (sort value, id) key of the last book on the previous
+    page. Seeking past it instead of using OFFSET keeps every page as cheap
+    as the first one. Rows are returned in ``BOOK_COLUMNS`` order.
+    """
+    scan_in_order = True
+    if genres and sort_by != "genre":
+        # Walking the sort order reads about limit / share books per page; sorting the matches reads them all.
+        matches, total = count_books(conn, genres), count_books(conn)
+        scan_in_order = matches * matches >= limit * total
+    
+    cursor = conn.cursor()
+    rows = []
+    try:
+        for query, params in _books_query(sort_by, genres, after, scan_in_order=scan_in_order):
+            cursor.execute(query + " LIMIT ?", params + [limit - len(rows)])
+            rows.extend(cursor.fetchall())
+            if len(rows) >= limit:
+                break
+        return rows
+    except sqlite3.Error:
+        return []
+
+def iter_books(conn, sort_by="title", genres=None, batch_size=1000, columns=BOOK_COLUMNS):
+    """Yield every matching book in batches of rows, in get_books_page order.
+
+    Rows are pulled from the cursor with fetchmany, so memory use depends on
+    ``batch_size`` and not on the size of the library.
+    """
+    for query, params in _books_query(sort_by, genres, columns=columns):
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+@profiled
+@cached_query
+def get_statistics(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT total_books, read_books FROM library_stats WHERE id = 1")
+        row = cursor.fetchone()
+        total_books, read_books = row if row else (0, 0)
+        
+        percentage_read = 0
+        if total_books > 0:
+            percentage_read = (read_books / total_books) * 100
+        
+        return total_books, read_books, percentage_read
+    except sqlite3.Error:
+        return 0, 0, 0
+
+@profiled
+@cached_query
+def get_home_snapshot(conn, limit=3):
+    """Everything the home page shows, read in one query from trigger-maintained tables.
+
+    Returns (total_books, read_books, percentage_read, recent_books), with
+    up to ``limit`` (at most RECENT_BOOKS_KEPT) of the newest books as
+    full rows, newest first.
+    """
+    columns = ", ".join(COLUMN_EXPRESSIONS[column] for column in BOOK_COLUMNS)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f'''
+        SELECT stats.total_books, stats.read_books, {columns}
+        FROM library_stats AS stats
+        LEFT JOIN recent_books AS recent
+        LEFT JOIN book_rows ON book_rows.id = recent.id
+        LEFT JOIN authors ON authors.id = book_rows.author_id
+        LEFT JOIN genres ON genres.id = book_rows.genre_id
+        WHERE stats.id = 1
+        ORDER BY recent.date_added DESC, recent.id DESC
+        LIMIT ?
+        ''', (max(1, min(limit, RECENT_BOOKS_KEPT)),))
+        rows = cursor.fetchall()
+    except sqlite3.Error:
+        return 0, 0, 0, []
+    
+    if not rows:
+        return 0, 0, 0, []
+    total_books, read_books = rows[0][:2]
+    percentage_read = (read_books / total_books) * 100 if total_books > 0 else 0
+    recent_books = [row[2:] for row in rows if row[2] is not None][:limit]
+    return total_books, read_books, percentage_read, recent_books
+
+@profiled
+@cached_query
+def get_genre_counts(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+        SELECT genres.name, genre_stats.book_count FROM genre_stats
+        JOIN genres ON genres.id = genre_stats.genre_id
+        ORDER BY genre_stats.book_count DESC, genres.name
+        ''')
+        return cursor.fetchall()
+    except sqlite3.Error:
+        return []
+
+@profiled
+@cached_query
+def get_decade_counts(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT decade, book_count FROM decade_stats ORDER BY decade")
+        return cursor.fetchall()
+    except sqlite3.Error:
+        return []
+
+@profiled
+@cached_query
+def get_top_authors(conn, limit=5):
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+        SELECT authors.name, author_stats.book_count FROM author_stats
+        JOIN authors ON authors.id = author_stats.author_id
+        ORDER BY author_stats.book_count DESC LIMIT ?
+        ''', (limit,))
+        return cursor.fetchall()
+    except sqlite3.Error:
+        return []
+
+@profiled
+@cached_query
+def get_most_read_author(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+        SELECT authors.name, author_stats.read_count FROM author_stats
+        JOIN authors ON authors.id = author_stats.author_id
+        WHERE author_stats.read_count > 0 ORDER BY author_stats.read_count DESC LIMIT 1
+        ''')
+        return cursor.fetchone()
+    except sqlite3.Error:
+        return None
+
+@profiled
+@cached_query
+def get_publication_extremes(conn):
+    """Return the (title, publication_year, author) of the oldest and newest book."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+        SELECT title, publication_year, author FROM books
+        WHERE publication_year IS NOT NULL ORDER BY publication_year, id LIMIT 1
+        ''')
+        oldest_book = cursor.fetchone()
+        cursor.execute('''
+        SELECT title, publication_year, author FROM books
+        WHERE publication_year IS NOT NULL ORDER BY publication_year DESC LIMIT 1
+        ''')
+        newest_book = cursor.fetchone()
+        return oldest_book, newest_book
+    except sqlite3.Error:
+        return None, None
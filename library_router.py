@@ -0,0 +1,227 @@
+"""Route each library to its own SQLite file.
+
+Every library id maps to a database file of its own under ``root``, so
+libraries never share a write lock. Files are spread over subdirectories
+named after a hash prefix of the id, which keeps directories small with
+thousands of libraries. A library's file is created and migrated the
+first time it is opened.
+
+At most ``max_open`` libraries are kept open. The least recently used one
+is closed when another is opened, unless it is leased: a script run or an
+API request holds a lease on its library from acquire() to release(), or
+for the length of a ``with router.lease(library_id)`` block.
+
+    python -m library_router libraries
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from library_db import DB_PATH, ConnectionManager
+from write_queue import WriteQueue
+
+LIBRARY_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+DEFAULT_ROOT = "libraries"
+
+
+class LibraryNotFoundError(LookupError):
+    """Raised when a library that was only to be read has no database file."""
+
+
+class LibraryRouter:
+    def __init__(self, root=DEFAULT_ROOT, default_path=DB_PATH, max_open=64):
+        self.root = root
+        self.default_path = default_path
+        self.max_open = max_open
+        self.opened = 0
+        self.evicted = 0
+        self._libraries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path_for(self, library_id):
+        """The database file of ``library_id``; None is the single-library default file."""
+        if library_id is None:
+            return self.default_path
+        if not LIBRARY_ID_PATTERN.match(library_id):
+            raise ValueError(f"invalid library id: {library_id!r}")
+        shard = hashlib.sha1(library_id.encode()).hexdigest()[:2]
+        return os.path.join(self.root, shard, f"{library_id}.db")
+
+    def _entry(self, library_id, leases=0, create=True):
+        path = self.path_for(library_id)
+        with self._lock:
+            entry = self._libraries.get(path)
+            if entry is not None:
+                self._libraries.move_to_end(path)
+                entry["leases"] += leases
+                return entry
+
+            # The default file keeps the single-library behaviour and is always created.
+            if not create and library_id is not None and not os.path.exists(path):
+                raise LibraryNotFoundError(f"no library {library_id!r}")
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            entry = {"manager": ConnectionManager(path), "reader": None, "writer": None, "leases": leases}
+            self._libraries[path] = entry
+            self.opened += 1
+            self._evict()
+            return entry
+
+    def _evict(self):
+        # The newest entry is about to be used, so it is never the one closed.
+        for path in list(self._libraries)[:-1]:
+            if len(self._libraries) <= self.max_open:
+                return
+            entry = self._libraries[path]
+            if entry["leases"] or entry["manager"].in_use() or (entry["reader"] is not None and entry["reader"].in_use()):
+                continue
+            del self._libraries[path]
+            _close(entry)
+            self.evicted += 1
+
+    def acquire(self, library_id=None, create=True):
+        """Open ``library_id`` and keep it open until a matching release().
+
+        With ``create`` unset, a library without a database file raises
+        LibraryNotFoundError instead of being created.
+        """
+        self._entry(library_id, leases=1, create=create)
+
+    def release(self, library_id=None):
+        """End a lease from acquire(); the library may be closed once it is idle."""
+        path = self.path_for(library_id)
+        with self._lock:
+            entry = self._libraries.get(path)
+            if entry is not None:
+                entry["leases"] -= 1
+
+    @contextmanager
+    def lease(self, library_id=None, create=True):
+        """Keep ``library_id`` open for the length of the block; ``create`` as in acquire()."""
+        self.acquire(library_id, create)
+        try:
+            yield
+        finally:
+            self.release(library_id)
+
+    def manager(self, library_id=None):
+        """The ConnectionManager of ``library_id``, opening (and if needed creating) it."""
+        return self._entry(library_id)["manager"]
+
+    def connection(self, library_id=None):
+        return self.manager(library_id).connection()
+
+    def reader(self, library_id=None):
+        """A ConnectionManager of read-only connections to ``library_id``, for pages that only read."""
+        entry = self._entry(library_id)
+        with self._lock:
+            if entry["reader"] is None:
+                entry["reader"] = ConnectionManager(entry["manager"].path, read_only=True)
+            return entry["reader"]
+
+    def writer(self, library_id=None):
+        """The WriteQueue of ``library_id``, started on first use."""
+        entry = self._entry(library_id)
+        with self._lock:
+            if entry["writer"] is None:
+                entry["writer"] = WriteQueue(entry["manager"].path)
+            return entry["writer"]
+
+    def library_paths(self):
+        """Database files of every library on disk, including the default one if it exists."""
+        paths = sorted(glob.glob(os.path.join(self.root, "*", "*.db")))
+        if self.default_path and os.path.exists(self.default_path):
+            paths.insert(0, self.default_path)
+        return paths
+
+    def aggregate_statistics(self, workers=8):
+        """Totals across every library on disk, read from each one's summary tables.
+
+        Files are opened read-only and outside the LRU, so an admin report
+        neither creates libraries nor pushes active ones out of the cache.
+        Libraries not yet migrated to the id-keyed summary tables are counted
+        under "unreadable" along with files that fail to open.
+        """
+        paths = self.library_paths()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            summaries = list(executor.map(_library_summary, paths))
+
+        totals = {"libraries": len(paths), "unreadable": 0, "total_books": 0, "read_books": 0}
+        genres = Counter()
+        per_library = []
+        for path, summary in zip(paths, summaries):
+            if summary is None:
+                totals["unreadable"] += 1
+                continue
+            total_books, read_books, genre_counts = summary
+            totals["total_books"] += total_books
+            totals["read_books"] += read_books
+            genres.update(genre_counts)
+            per_library.append((path, total_books, read_books))
+        totals["genre_counts"] = genres.most_common()
+        totals["largest_libraries"] = sorted(per_library, key=lambda library: -library[1])[:10]
+        return totals
+
+    def stats(self):
+        with self._lock:
+            return {"open": len(self._libraries), "opened": self.opened, "evicted": self.evicted}
+
+    def close(self):
+        with self._lock:
+            for entry in self._libraries.values():
+                _close(entry)
+            self._libraries.clear()
+
+
+def _close(entry):
+    if entry["writer"] is not None:
+        entry["writer"].close()
+    if entry["reader"] is not None:
+        entry["reader"].close()
+    entry["manager"].close()
+
+
+def _library_summary(path):
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=5)
+    except sqlite3.Error:
+        return None
+    try:
+        row = conn.execute("SELECT total_books, read_books FROM library_stats WHERE id = 1").fetchone()
+        genre_counts = dict(conn.execute(
+            "SELECT genres.name, book_count FROM genre_stats JOIN genres ON genres.id = genre_stats.genre_id"
+        ))
+        total_books, read_books = row if row else (0, 0)
+        return total_books, read_books, genre_counts
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize every library under a router root.")
+    parser.add_argument("root", nargs="?", default=DEFAULT_ROOT, help="directory holding the library files")
+    parser.add_argument("--default-path", default=DB_PATH, help="the single-library database to include")
+    args = parser.parse_args(argv)
+
+    totals = LibraryRouter(args.root, args.default_path).aggregate_statistics()
+    print(f"{totals['libraries']} libraries ({totals['unreadable']} unreadable), "
+          f"{totals['total_books']} books, {totals['read_books']} read")
+    for genre, count in totals["genre_counts"][:10]:
+        print(f"  {genre:<30} {count:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
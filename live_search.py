@@ -0,0 +1,66 @@
+"""Search-as-you-type state for one user session.
+
+Each keystroke that survives the input's debounce calls ``LiveSearch.search``.
+When the new term only extends the previous one (another letter, another
+word) and the previous results were complete, the new results are a subset
+of them, so they are filtered in memory instead of queried again. Results
+are only reused within one data version of the database (see QueryCache),
+so a book added or removed since the last query shows up. Queries
+fetch at most ``pool_size`` rows.
+"""
+
+from fuzzy_index import words
+from library_db import BOOK_COLUMNS, SEARCH_COLUMNS, search_books
+from query_cache import QUERY_CACHE, database_key
+
+MIN_TERM_LENGTH = 2
+
+
+def _matches(text, query_words):
+    """The in-memory equivalent of build_fts_query: every word present, the last one as a prefix."""
+    tokens = set(words(text or ""))
+    *whole, last = query_words
+    return all(word in tokens for word in whole) and any(token.startswith(last) for token in tokens)
+
+
+class LiveSearch:
+    def __init__(self, pool_size=500):
+        self.pool_size = pool_size
+        self.queries = 0
+        self.narrowed = 0
+        self._previous = None
+
+    def search(self, conn, term, search_by, fuzzy=False, wanted=0):
+        """Books matching ``term``, at least ``wanted`` of them if there are that many."""
+        # The data version is read before querying, so rows from a query a write overtook are not reused.
+        scope = (database_key(conn), QUERY_CACHE.data_version(conn), search_by, fuzzy)
+        rows = self._from_previous(scope, term, wanted)
+        if rows is not None:
+            return rows
+
+        rows = search_books(conn, term, search_by, limit=max(self.pool_size, wanted), fuzzy=fuzzy)
+        self.queries += 1
+        complete = len(rows) < max(self.pool_size, wanted)
+        self._previous = (scope, term, rows, complete)
+        return rows
+
+    def _from_previous(self, scope, term, wanted):
+        if self._previous is None:
+            return None
+        previous_scope, previous_term, rows, complete = self._previous
+        if scope != previous_scope:
+            return None
+        if term == previous_term and (complete or len(rows) >= wanted):
+            return rows
+
+        # Typo-tolerant matches and exact phrases do not shrink predictably as the term grows.
+        _, _, search_by, fuzzy = scope
+        query_words = words(term)
+        if (fuzzy or not complete or not query_words or not words(previous_term)
+                or not term.startswith(previous_term) or '"' in term):
+            return None
+        position = BOOK_COLUMNS.index(SEARCH_COLUMNS[search_by.lower()])
+        narrowed = [row for row in rows if _matches(row[position], query_words)]
+        self.narrowed += 1
+        self._previous = (scope, term, narrowed, True)
+        return narrowed
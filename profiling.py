@@ -0,0 +1,180 @@
+"""Opt-in timing of data-access calls and page renders.
+
+While ``PROFILER.enabled`` is set, every call of a ``@profiled`` function
+records its wall time, the rows it returned and the SQL it executed, with
+the ``EXPLAIN QUERY PLAN`` of each distinct statement. Code blocks such as
+page renders are timed with ``PROFILER.span``. When disabled, the wrappers
+cost one attribute check.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+
+
+def _percentile(sorted_values, fraction):
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def _count_rows(result):
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    return 1
+
+
+class Profiler:
+    def __init__(self, max_samples=1000, max_events=10000, max_plans=500):
+        self.enabled = False
+        self.max_samples = max_samples
+        self.max_plans = max_plans
+        self._durations = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self._rows = {}
+        self._events = deque(maxlen=max_events)
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, name, category, started, duration_ms, rows=None, statements=()):
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": int(started * 1_000_000),
+            "dur": int(duration_ms * 1000),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {},
+        }
+        if rows is not None:
+            event["args"]["rows"] = rows
+        if statements:
+            event["args"]["sql"] = list(statements)
+        with self._lock:
+            self._durations[name].append(duration_ms)
+            if rows is not None:
+                self._rows[name] = rows
+            self._events.append(event)
+
+    @contextmanager
+    def span(self, name, category="render"):
+        """Time the enclosed block under ``name`` when profiling is enabled."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, category, started, (time.perf_counter() - started) * 1000)
+
+    def explain(self, conn, name, statements):
+        """Store the query plan of every statement not seen before."""
+        for sql in statements:
+            if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+                continue
+            with self._lock:
+                if sql in self._plans:
+                    continue
+            try:
+                plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+            except Exception as error:
+                plan = [f"unavailable: {error}"]
+            with self._lock:
+                self._plans[sql] = (name, plan)
+                while len(self._plans) > self.max_plans:
+                    self._plans.popitem(last=False)
+
+    def summary(self):
+        """Per-name call count, latency percentiles in milliseconds and rows of the last call."""
+        with self._lock:
+            items = [(name, sorted(durations), self._rows.get(name)) for name, durations in self._durations.items()]
+        rows = []
+        for name, durations, last_rows in sorted(items):
+            if not durations:
+                continue
+            rows.append({
+                "name": name,
+                "calls": len(durations),
+                "p50_ms": _percentile(durations, 0.50),
+                "p95_ms": _percentile(durations, 0.95),
+                "p99_ms": _percentile(durations, 0.99),
+                "max_ms": durations[-1],
+                "last_rows": last_rows,
+            })
+        return rows
+
+    def plans(self):
+        """Recent query plans as (function name, sql, plan lines), newest first."""
+        with self._lock:
+            return [(name, sql, plan) for sql, (name, plan) in reversed(self._plans.items())]
+
+    def trace_json(self):
+        """The recorded events in Chrome trace event format (chrome://tracing, Perfetto)."""
+        with self._lock:
+            events = list(self._events)
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self._rows.clear()
+            self._events.clear()
+            self._plans.clear()
+
+
+PROFILER = Profiler()
+
+
+# Statement lists of the @profiled calls running on each connection, outermost first.
+_active_calls = {}
+
+
+def _trace_into(calls):
+    def trace(sql):
+        for statements in calls:
+            statements.append(sql)
+    return trace
+
+
+def profiled(func):
+    """Record timing, rows and SQL of ``func(conn, ...)`` while PROFILER is enabled.
+
+    A call nested in another on the same connection records its SQL in both,
+    so the outer call's statements include those of the calls it made.
+    """
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        if not PROFILER.enabled:
+            return func(conn, *args, **kwargs)
+
+        statements = []
+        calls = _active_calls.get(id(conn))
+        if calls is None:
+            calls = _active_calls[id(conn)] = []
+            conn.set_trace_callback(_trace_into(calls))
+        calls.append(statements)
+        started = time.perf_counter()
+        try:
+            result = func(conn, *args, **kwargs)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            calls.pop()
+            if not calls:
+                del _active_calls[id(conn)]
+                conn.set_trace_callback(None)
+        PROFILER.record(func.__name__, "db", started, duration_ms, _count_rows(result), statements)
+        if calls:
+            # Keep the plan lookups out of the enclosing calls' statements.
+            conn.set_trace_callback(None)
+        PROFILER.explain(conn, func.__name__, statements)
+        if calls:
+            conn.set_trace_callback(_trace_into(calls))
+        return result
+
+    return wrapper
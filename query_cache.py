@@ -0,0 +1,116 @@
+"""Process-wide cache of read query results, invalidated by writes."""
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def database_key(conn):
+    """Identify the database a connection is open on, so all its connections share entries."""
+    return getattr(conn, "path", id(conn))
+
+
+class QueryCache:
+    """Results of read functions keyed on (database, function, arguments).
+
+    Each database has a data version that every write bumps; entries cached
+    under an older version are treated as misses. Entries also expire after
+    ``ttl`` seconds, which bounds staleness after writes from other
+    processes, and the least recently used entry is evicted beyond
+    ``maxsize``. Results longer than ``max_rows`` are not cached at all.
+
+    Cached results are shared between callers and must not be modified.
+    """
+
+    def __init__(self, maxsize=512, ttl=60.0, max_rows=10000):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def call(self, func, conn, args, kwargs):
+        database = database_key(conn)
+        key = (database, func.__qualname__, _freeze(args), _freeze(kwargs))
+        now = time.monotonic()
+
+        with self._lock:
+            version = self._versions.get(database, 0)
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, expires_at, value = entry
+                if entry_version == version and expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+
+        value = func(conn, *args, **kwargs)
+
+        too_large = isinstance(value, list) and len(value) > self.max_rows
+        with self._lock:
+            # Skip caching if a write landed while the query ran.
+            if not too_large and self._versions.get(database, 0) == version:
+                self._entries[key] = (version, now + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, conn):
+        """Record a write to ``conn``'s database, making its cached results stale."""
+        database = database_key(conn)
+        with self._lock:
+            self._versions[database] = self._versions.get(database, 0) + 1
+            self.invalidations += 1
+
+    def data_version(self, conn):
+        with self._lock:
+            return self._versions.get(database_key(conn), 0)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+QUERY_CACHE = QueryCache()
+
+
+def cached_query(func):
+    """Serve ``func(conn, ...)`` from QUERY_CACHE; the uncached function stays available as ``.uncached``."""
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        return QUERY_CACHE.call(func, conn, args, kwargs)
+
+    wrapper.uncached = func
+    return wrapper
@@ -0,0 +1,69 @@
+"""Where the time of each Streamlit script run goes before and during the page.
+
+app.py starts a ``ScriptRun`` as its first statement and marks the end of
+each phase: importing its modules, opening the session's library, and
+rendering the page. The first run in a process is the cold start and is
+kept separately; later runs show the overhead every widget interaction
+pays. Recording is always on and costs a few ``perf_counter`` calls per
+run, so the cold start is captured before anyone could switch profiling
+on.
+"""
+
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+
+
+class ScriptRun:
+    def __init__(self, timer, started):
+        self.timer = timer
+        self.started = started
+        self.phases = {}
+        self._last = started
+
+    def mark(self, phase):
+        """End ``phase``, which ran since the previous mark."""
+        now = time.perf_counter()
+        self.phases[phase] = (now - self._last) * 1000
+        self._last = now
+
+    def finish(self, page):
+        self.timer.finished(self, page)
+
+
+class StartupTimer:
+    def __init__(self, max_runs=100):
+        self.cold_start = None
+        self._runs = defaultdict(lambda: deque(maxlen=max_runs))
+        self._lock = threading.Lock()
+
+    def start(self, started=None):
+        return ScriptRun(self, time.perf_counter() if started is None else started)
+
+    def finished(self, run, page):
+        record = dict(run.phases, total=(run._last - run.started) * 1000)
+        with self._lock:
+            if self.cold_start is None:
+                self.cold_start = dict(record, page=page)
+            else:
+                self._runs[page].append(record)
+
+    def summary(self):
+        """Median milliseconds per phase of the runs after the cold start, one dict per page."""
+        with self._lock:
+            runs = {page: list(records) for page, records in self._runs.items()}
+        rows = []
+        for page, records in sorted(runs.items()):
+            row = {"page": page, "runs": len(records)}
+            for phase in records[-1]:
+                row[phase] = statistics.median(record.get(phase, 0.0) for record in records)
+            rows.append(row)
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._runs.clear()
+
+
+STARTUP_TIMER = StartupTimer()
@@ -0,0 +1,197 @@
+"""Single-writer queue that group-commits writes from every session.
+
+SQLite allows one writer at a time, so when many sessions write at once
+each commit waits on the previous one and eventually on the busy timeout.
+Instead, sessions submit writes to a ``WriteQueue``. Its background thread
+owns the only writing connection and applies queued writes in batches:
+each write runs inside its own savepoint, so one failing write is rolled
+back without affecting the others, and the whole batch is committed once.
+A batch closes when it reaches ``max_batch`` writes or ``max_delay``
+seconds after its first write arrived.
+
+Every submission returns a ``concurrent.futures.Future`` that resolves
+once the batch holding it is committed, with the write's result or the
+exception it raised.
+
+Between batches, at most every ``compact_interval`` seconds, the writer
+also compacts the change journal down to ``retention_days`` (see
+change_log.compact_changes).
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from change_log import DEFAULT_RETENTION_DAYS, compact_changes
+from library_db import DB_PATH, DuplicateBookError, connect, find_duplicate, insert_books, intern_names, merge_into
+from profiling import PROFILER
+from query_cache import QUERY_CACHE
+
+_STOP = object()
+
+
+def insert_book(conn, title, author, publication_year, genre, read_status, allow_duplicate=False):
+    """Insert one book and return its id.
+
+    Raises DuplicateBookError if the book is already stored, unless ``allow_duplicate`` is set.
+    """
+    if not allow_duplicate:
+        duplicate_id = find_duplicate(conn, title, author, publication_year)
+        if duplicate_id is not None:
+            raise DuplicateBookError(duplicate_id)
+    return insert_books(conn.cursor(), [(title, author, publication_year, genre, read_status)])
+
+
+def delete_books(conn, book_ids):
+    return conn.executemany("DELETE FROM book_rows WHERE id = ?", [(book_id,) for book_id in book_ids]).rowcount
+
+
+def update_read_status(conn, book_ids, read_status):
+    read_status_int = 1 if read_status else 0
+    return conn.executemany("UPDATE book_rows SET read_status = ? WHERE id = ?",
+                            [(read_status_int, book_id) for book_id in book_ids]).rowcount
+
+
+def update_genre(conn, book_ids, genre):
+    cursor = conn.cursor()
+    intern_names(cursor, "genres", [genre])
+    return cursor.executemany("UPDATE book_rows SET genre_id = (SELECT id FROM genres WHERE name = ?) WHERE id = ?",
+                              [(genre, book_id) for book_id in book_ids]).rowcount
+
+
+def merge_books(conn, keep_id, duplicate_ids):
+    return merge_into(conn.cursor(), keep_id, duplicate_ids)
+
+
+class WriteQueue:
+    """Applies writes submitted from any thread on one background writer thread."""
+
+    def __init__(self, path=DB_PATH, max_batch=100, max_delay=0.005,
+                 retention_days=DEFAULT_RETENTION_DAYS, compact_interval=3600.0):
+        self.path = path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.retention_days = retention_days
+        self.compact_interval = compact_interval
+        self._next_compaction = 0.0
+        self.batches = 0
+        self.writes = 0
+        self.failures = 0
+        self._requests = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="library-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, operation, *args):
+        """Queue ``operation(conn, *args)`` and return a Future for its result."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("write queue is closed")
+            self._requests.put((operation, args, future))
+        return future
+
+    def add_book(self, title, author, publication_year, genre, read_status, allow_duplicate=False):
+        return self.submit(insert_book, title, author, publication_year, genre, read_status, allow_duplicate)
+
+    def remove_books(self, book_ids):
+        return self.submit(delete_books, list(book_ids))
+
+    def set_read_status(self, book_ids, read_status):
+        return self.submit(update_read_status, list(book_ids), read_status)
+
+    def set_genre(self, book_ids, genre):
+        return self.submit(update_genre, list(book_ids), genre)
+
+    def merge_books(self, keep_id, duplicate_ids):
+        return self.submit(merge_books, keep_id, list(duplicate_ids))
+
+    def close(self, timeout=None):
+        """Apply the writes already queued, then stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._requests.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "writes": self.writes,
+            "failures": self.failures,
+            "writes_per_batch": self.writes / self.batches if self.batches else 0.0,
+            "queued": self._requests.qsize(),
+        }
+
+    def _next_batch(self):
+        """Block for the next write, then gather more until the batch is full or its delay has passed."""
+        first = self._requests.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self._requests.get(timeout=remaining) if remaining > 0 else self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is _STOP:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _run(self):
+        conn = connect(self.path)
+        try:
+            stopping = False
+            while not stopping:
+                batch, stopping = self._next_batch()
+                if batch:
+                    with PROFILER.span("write_queue:batch", "db"):
+                        self._apply(conn, batch)
+                if time.monotonic() >= self._next_compaction:
+                    compact_changes(conn, self.retention_days)
+                    self._next_compaction = time.monotonic() + self.compact_interval
+        finally:
+            conn.close()
+
+    def _apply(self, conn, batch):
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for operation, args, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT queued_write")
+                try:
+                    result = operation(conn, *args)
+                except Exception as error:
+                    conn.execute("ROLLBACK TO queued_write")
+                    outcomes.append((future, None, error))
+                else:
+                    outcomes.append((future, result, None))
+                conn.execute("RELEASE queued_write")
+            conn.commit()
+        except sqlite3.Error as error:
+            if conn.in_transaction:
+                conn.rollback()
+            for _, _, future in batch:
+                if future.running() or future.set_running_or_notify_cancel():
+                    self.failures += 1
+                    future.set_exception(error)
+            return
+
+        QUERY_CACHE.invalidate(conn)
+        self.batches += 1
+        for future, result, error in outcomes:
+            self.writes += 1
+            if error is None:
+                future.set_result(result)
+            else:
+                self.failures += 1
+                future.set_exception(error)